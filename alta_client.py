@@ -4,15 +4,49 @@ Handles authentication, HTTP requests, and response parsing for Alta Cloud APIs
 """
 
 import requests
+import hashlib
 import logging
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
+import orjson
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Tuple
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import threading
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
 import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MS_PER_DAY = 86_400_000
+
+
+def _day_bounds_ms() -> Tuple[int, int]:
+    """
+    Get the UTC day boundaries as epoch milliseconds
+    
+    Returns:
+        Tuple of (today_start_ms, yesterday_start_ms), both at 00:00 UTC
+    """
+    now_ms = int(time.time() * 1000)
+    today_start_ms = now_ms - now_ms % MS_PER_DAY
+    return today_start_ms, today_start_ms - MS_PER_DAY
+
+
+# Status codes that always fail: (%-style log message, str.format AltaAPIError message)
+_STATUS_ERRORS = {
+    401: ("Authentication failed - invalid token",
+          "Authentication failed. Please check your API token."),
+    403: ("Access forbidden - insufficient permissions",
+          "Access forbidden. You don't have permission for this resource."),
+    404: ("Resource not found: %(endpoint)s",
+          "Resource not found: {endpoint}"),
+}
+
 
 class AltaAPIError(Exception):
     """Custom exception for Alta API errors"""
@@ -30,27 +64,124 @@ class AltaClient:
     - Response parsing
     """
     
-    def __init__(self, base_url: str, api_token: str):
+    # Event types never reported as denied attempts
+    _EXCLUDED_DENIED_TYPES = frozenset({'HELD_OPEN', 'HELD_OPEN_ENDED'})
+    # Low-cardinality event fields shared across many cached events
+    _INTERNED_EVENT_FIELDS = (
+        'event_type', 'event_name', 'access_point_name', 'reader_name',
+        'site_name', 'cardholder_name'
+    )
+    # Upper bound for plausible event times (~year 2096, in epoch milliseconds);
+    # the same bound the app uses when formatting times, and well inside int64
+    _MAX_EVENT_TIME_MS = 4_000_000_000_000
+    # Fraction of the cache TTL after which events are refreshed in the background
+    _REFRESH_AHEAD = 0.8
+    
+    # Pooled sessions shared by clients with the same (base_url, token digest,
+    # max_retries); keying on the token keeps one tenant's cookies out of another's requests
+    _sessions: Dict[Tuple[str, str, int], requests.Session] = {}
+    _sessions_lock = threading.Lock()
+    # Worker count for fan-out lookups such as get_access_events_by_guids
+    _FANOUT_WORKERS = 16
+    # Process-wide cap on in-flight API requests (retries included), so bursts
+    # from many sessions don't trip the API's rate limit; sized to one full
+    # fan-out so a single lookup isn't throttled into several rounds
+    _request_slots = threading.BoundedSemaphore(_FANOUT_WORKERS)
+    
+    def __init__(
+        self,
+        base_url: str,
+        api_token: str,
+        max_retries: int = 3,
+        cache_ttl_seconds: float = 30
+    ):
         """
         Initialize Alta API client
         
         Args:
             base_url: Organization base URL (e.g., https://ifss-kenya-office.eu2.alta.avigilon.com)
             api_token: API authentication token
+            max_retries: Number of retries on transient failures (429/5xx, connection errors)
+            cache_ttl_seconds: Maximum age of cached access events before a blocking refetch;
+                keep it no longer than any cache layered on top, or that cache's
+                shorter TTL only ever re-reads stale events
         """
         self.base_url = base_url.rstrip('/')
         self.api_token = api_token
-        self.session = requests.Session()
+        # Identifies the credentials without exposing the token (session and cache keys)
+        self.token_digest = hashlib.sha256(api_token.encode()).hexdigest()
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.session = self._shared_session(self.base_url, self.token_digest, max_retries)
+        # Sent per request rather than stored on the pooled session's default headers
+        self._auth_headers = {'Authorization': f'Bearer {self.api_token}'}
+        self._current_user = None  # Cache for /api/v1/me (stable for the token's lifetime)
         self._cached_events = None  # Cache for access events
+        self._events_fetched_at = 0.0  # time.monotonic() of the last successful fetch
+        # (events with a numeric time sorted ascending, parallel int64 array of their times),
+        # swapped as one tuple so readers never see a mismatched pair
+        self._event_index = ([], array('q'))
+        self._events_lock = threading.Lock()
+        self._refresh_thread = None
+        self._etags = {}  # endpoint -> ETag of the last conditional GET
+        self._response_cache = {}  # endpoint -> parsed body matching that ETag
+        
+        logger.info("Initialized AltaClient for: %s", base_url)
+    
+    @classmethod
+    def _shared_session(cls, base_url: str, token_digest: str, max_retries: int) -> requests.Session:
+        """
+        Get the pooled session for a base URL and token, creating it on first use
+        
+        Args:
+            base_url: Organization base URL
+            token_digest: SHA-256 hex digest of the API token
+            max_retries: Number of retries on transient failures
+            
+        Returns:
+            Shared requests session
+        """
+        key = (base_url, token_digest, max_retries)
+        with cls._sessions_lock:
+            session = cls._sessions.get(key)
+            if session is None:
+                session = cls._sessions[key] = cls._new_session(max_retries)
+            return session
+    
+    @staticmethod
+    def _new_session(max_retries: int) -> requests.Session:
+        """
+        Build a session with retries and a connection pool mounted
+        
+        Args:
+            max_retries: Number of retries on transient failures
+            
+        Returns:
+            New requests session
+        """
+        session = requests.Session()
+        
+        # Retries (with backoff and Retry-After support) are handled by urllib3
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({'GET', 'POST'}),
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=32, pool_maxsize=32)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
         
         # Set default headers
-        self.session.headers.update({
-            'Authorization': f'Bearer {self.api_token}',
+        # ACCEPT_ENCODING lists only the codings urllib3 can decode here
+        # (adds br when brotli is installed)
+        session.headers.update({
             'Content-Type': 'application/json',
-            'Accept': 'application/json'
+            'Accept': 'application/json',
+            'Accept-Encoding': ACCEPT_ENCODING,
+            'Connection': 'keep-alive'
         })
-        
-        logger.info(f"Initialized AltaClient for: {base_url}")
+        return session
     
     def _make_request(
         self, 
@@ -58,17 +189,21 @@ class AltaClient:
         endpoint: str, 
         params: Optional[Dict] = None,
         data: Optional[Dict] = None,
-        retry_count: int = 3
+        conditional: bool = False
     ) -> Optional[Dict[str, Any]]:
         """
         Make HTTP request to Alta API
         
+        Transient failures (429, 5xx, connection errors) are retried by the
+        session's HTTPAdapter before this method sees the response.
+        
         Args:
             method: HTTP method (GET, POST, etc.)
             endpoint: API endpoint (e.g., /api/v1/accessEvents)
             params: Query parameters
             data: Request body data
-            retry_count: Number of retries on failure
+            conditional: Send If-None-Match with the last ETag for this endpoint
+                and reuse the previous body on 304 (GET without params only)
             
         Returns:
             Parsed JSON response or None
@@ -77,139 +212,292 @@ class AltaClient:
             AltaAPIError: On API errors or network issues
         """
         url = f"{self.base_url}{endpoint}"
+        conditional = conditional and method == 'GET' and not params
         
-        logger.info(f"Making {method} request to: {endpoint}")
+        headers = self._auth_headers
+        if conditional and endpoint in self._etags:
+            headers = {**headers, 'If-None-Match': self._etags[endpoint]}
         
-        for attempt in range(retry_count):
-            try:
+        logger.info("Making %s request to: %s", method, endpoint)
+        
+        try:
+            with self._request_slots:
                 response = self.session.request(
                     method=method,
                     url=url,
                     params=params,
-                    json=data,
+                    data=orjson.dumps(data) if data is not None else None,
+                    headers=headers,
                     timeout=30
                 )
-                
-                # Handle HTTP errors
-                if response.status_code == 401:
-                    logger.error("Authentication failed - invalid token")
-                    raise AltaAPIError("Authentication failed. Please check your API token.")
-                
-                elif response.status_code == 403:
-                    logger.error("Access forbidden - insufficient permissions")
-                    raise AltaAPIError("Access forbidden. You don't have permission for this resource.")
-                
-                elif response.status_code == 404:
-                    logger.error(f"Resource not found: {endpoint}")
-                    raise AltaAPIError(f"Resource not found: {endpoint}")
-                
-                elif response.status_code == 204:
-                    # No content - return empty dict
-                    return {}
-                
-                elif response.status_code == 429:
-                    logger.warning("Rate limit exceeded, waiting before retry...")
-                    time.sleep(2 ** attempt)
-                    continue
-                
-                elif response.status_code >= 500:
-                    logger.error(f"Server error: {response.status_code}")
-                    if attempt < retry_count - 1:
-                        time.sleep(1)
-                        continue
-                    raise AltaAPIError(f"Server error: {response.status_code}")
-                
-                # Raise for other bad status codes
-                response.raise_for_status()
-                
-                # Check if response is JSON
-                content_type = response.headers.get('Content-Type', '')
-                if 'application/json' not in content_type:
-                    logger.warning(f"Non-JSON response: {content_type}")
-                    return {}
-                
-                # Parse and return JSON response
-                try:
-                    return response.json()
-                except ValueError:
-                    logger.error("Failed to parse JSON response")
-                    return {}
-                
-            except requests.exceptions.Timeout:
-                logger.error(f"Request timeout (attempt {attempt + 1}/{retry_count})")
-                if attempt < retry_count - 1:
-                    time.sleep(1)
-                    continue
-                raise AltaAPIError("Request timeout. Please try again.")
-            
-            except requests.exceptions.ConnectionError:
-                logger.error(f"Connection error (attempt {attempt + 1}/{retry_count})")
-                if attempt < retry_count - 1:
-                    time.sleep(1)
-                    continue
-                raise AltaAPIError("Unable to connect to Alta API. Please check your network.")
-            
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Request failed: {str(e)}")
-                raise AltaAPIError(f"Request failed: {str(e)}")
         
-        raise AltaAPIError("Maximum retries exceeded")
+        except requests.exceptions.RetryError as e:
+            logger.error("Maximum retries exceeded: %s", e)
+            raise AltaAPIError("Maximum retries exceeded. Please try again later.")
+        
+        except requests.exceptions.Timeout:
+            logger.error("Request timeout")
+            raise AltaAPIError("Request timeout. Please try again.")
+        
+        except requests.exceptions.ConnectionError:
+            logger.error("Connection error")
+            raise AltaAPIError("Unable to connect to Alta API. Please check your network.")
+        
+        except requests.exceptions.RequestException as e:
+            logger.error("Request failed: %s", e)
+            raise AltaAPIError(f"Request failed: {str(e)}")
+        
+        # Handle HTTP errors
+        status_code = response.status_code
+        status_error = _STATUS_ERRORS.get(status_code)
+        if status_error:
+            log_message, error_message = status_error
+            # Mapping args are formatted lazily; messages without a placeholder ignore them
+            logger.error(log_message, {"endpoint": endpoint})
+            raise AltaAPIError(error_message.format(endpoint=endpoint))
+        
+        if status_code == 204:
+            # No content - return empty dict
+            return {}
+        
+        if status_code == 304:
+            # Not modified - reuse the body stored with the ETag
+            logger.info("Not modified: %s", endpoint)
+            return self._response_cache.get(endpoint, {})
+        
+        if status_code >= 500:
+            logger.error("Server error: %s", status_code)
+            raise AltaAPIError(f"Server error: {status_code}")
+        
+        # Raise for other bad status codes
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            logger.error("Request failed: %s", e)
+            raise AltaAPIError(f"Request failed: {str(e)}")
+        
+        # Check if response is JSON
+        content_type = response.headers.get('Content-Type', '')
+        if 'application/json' not in content_type:
+            logger.warning("Non-JSON response: %s", content_type)
+            return {}
+        
+        # Parse and return JSON response
+        try:
+            parsed = orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            logger.error("Failed to parse JSON response")
+            return {}
+        
+        etag = response.headers.get('ETag')
+        if conditional and etag:
+            self._etags[endpoint] = etag
+            self._response_cache[endpoint] = parsed
+        
+        return parsed
+    
+    @staticmethod
+    def _unwrap_list(response: Any, *keys: str) -> List[Dict]:
+        """
+        Extract the item list from a direct list or wrapped response
+        
+        Args:
+            response: Parsed JSON response
+            keys: Wrapper keys to try in order (e.g., 'data', 'events')
+            
+        Returns:
+            List of items, or an empty list if none were found
+        """
+        if not response:
+            return []
+        if isinstance(response, list):
+            return response
+        for key in keys:
+            items = response.get(key)
+            if items is not None:
+                return items
+        return []
     
     # ========== USER IDENTITY ==========
     
     def get_current_user(self) -> Optional[Dict]:
         """
-        Get the current authenticated user
+        Get the current authenticated user (cached after first success)
         
         Returns:
             Current user dictionary or None
         """
+        if self._current_user is not None:
+            return self._current_user
+        
         endpoint = "/api/v1/me"
         
         try:
             response = self._make_request('GET', endpoint)
             if response:
-                logger.info(f"Retrieved current user")
+                logger.info("Retrieved current user")
+                self._current_user = response
                 return response
             return None
         except AltaAPIError as e:
-            logger.error(f"Failed to get current user: {str(e)}")
+            logger.error("Failed to get current user: %s", e)
             return None
     
+    def invalidate_user(self):
+        """Drop the cached current user (e.g. after rotating the API token)"""
+        self._current_user = None
+    
     # ========== ACCESS EVENTS ==========
     
     def get_access_events(self) -> List[Dict]:
         """
-        Get access events (cached after first call)
+        Get access events (cached for cache_ttl_seconds)
+        
+        Once the cache is older than _REFRESH_AHEAD of the TTL, the cached events
+        are returned while a background thread refetches them; past the TTL the
+        caller blocks on the refetch.
         
         Returns:
             List of access event dictionaries
         """
-        # Return cached events if available
-        if self._cached_events is not None:
-            logger.info(f"Returning {len(self._cached_events)} cached access events")
-            return self._cached_events
+        # Return cached events if available. Read the cache once: invalidate_events()
+        # may clear it from another session between the check and the return
+        events = self._cached_events
+        if events is not None:
+            age = time.monotonic() - self._events_fetched_at
+            if age <= self.cache_ttl_seconds:
+                if age > self.cache_ttl_seconds * self._REFRESH_AHEAD:
+                    self._refresh_events_in_background()
+                logger.info("Returning %d cached access events", len(events))
+                return events
+        
+        return self._refresh_events(self.cache_ttl_seconds)
+    
+    def invalidate_events(self):
+        """Drop cached access events so the next call refetches them"""
+        with self._events_lock:
+            self._cached_events = None
+            self._event_index = ([], array('q'))
+    
+    def _refresh_events(self, max_age: float) -> List[Dict]:
+        """
+        Fetch access events and refill the cache
         
+        Args:
+            max_age: Skip the fetch if another caller refilled the cache within this many seconds
+            
+        Returns:
+            List of access event dictionaries
+        """
         endpoint = "/api/v1/accessEvents"
         
-        try:
-            logger.info(f"Calling {endpoint} with no parameters")
-            response = self._make_request('GET', endpoint)
-            if not response:
-                logger.info("No response returned from accessEvents")
-                return []
+        with self._events_lock:
+            if (self._cached_events is not None and
+                    time.monotonic() - self._events_fetched_at <= max_age):
+                return self._cached_events
             
-            # Handle both direct list and wrapped response
-            events = response if isinstance(response, list) else response.get('data', response.get('events', []))
-            
-            # Cache the events
-            self._cached_events = events
+            try:
+                logger.info("Calling %s with no parameters", endpoint)
+                response = self._make_request('GET', endpoint, conditional=True)
+                if response:
+                    events = self._unwrap_list(response, 'data', 'events')
+                else:
+                    # Cache the empty result too, so the date filters agree with
+                    # this call and the next one doesn't refetch straight away
+                    logger.info("No response returned from accessEvents")
+                    events = []
+                
+                # Cache the events
+                self._cache_events(events)
+                
+                logger.info("Retrieved and cached %d access events", len(events))
+                return events
+            except AltaAPIError as e:
+                logger.error("Failed to get access events: %s", e)
+                raise
+    
+    def _refresh_events_in_background(self):
+        """Start a background refetch of access events unless one is already running"""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        
+        def refresh():
+            try:
+                self._refresh_events(self.cache_ttl_seconds * self._REFRESH_AHEAD)
+            except AltaAPIError:
+                pass  # Already logged; callers keep the cached events until the TTL expires
+        
+        self._refresh_thread = threading.Thread(target=refresh, daemon=True)
+        self._refresh_thread.start()
+    
+    def _cache_events(self, events: List[Dict]):
+        """
+        Cache access events and build the time index used by the date filters
+        
+        Args:
+            events: List of access event dictionaries
+        """
+        # Intern repeated strings so each distinct value is stored once across
+        # the cache, and lowercase event names once so the filters don't redo it
+        intern = sys.intern
+        interned_fields = self._INTERNED_EVENT_FIELDS
+        for event in events:
+            for field in interned_fields:
+                value = event.get(field)
+                if type(value) is str:
+                    event[field] = intern(value)
+            event['_event_name_lc'] = intern((event.get('event_name') or '').lower())
+        
+        # Out-of-range (or NaN/inf) times are left out of the index: they would
+        # overflow the int64 array and can't fall inside any date window anyway
+        max_time = self._MAX_EVENT_TIME_MS
+        timed_events = [
+            event for event in events
+            if isinstance(event.get('time'), (int, float)) and 0 < event['time'] < max_time
+        ]
+        timed_events.sort(key=lambda x: x['time'])
+        
+        times = array('q', [int(event['time']) for event in timed_events])
+        self._event_index = (timed_events, times)
+        self._cached_events = events
+        self._events_fetched_at = time.monotonic()
+    
+    def _event_range(self, start_ms: float, end_ms: Optional[float] = None) -> Tuple[List[Dict], int, int]:
+        """
+        Locate cached events with start_ms <= time < end_ms (open-ended if end_ms is None)
+        
+        Args:
+            start_ms: Inclusive lower bound in epoch milliseconds
+            end_ms: Exclusive upper bound in epoch milliseconds
             
-            logger.info(f"Retrieved and cached {len(events)} access events")
-            return events
-        except AltaAPIError as e:
-            logger.error(f"Failed to get access events: {str(e)}")
-            raise
+        Returns:
+            Tuple of (sorted events, lo, hi) where sorted_events[lo:hi] is the range
+        """
+        sorted_events, times = self._event_index
+        lo = bisect_left(times, start_ms)
+        hi = len(times) if end_ms is None else bisect_left(times, end_ms, lo)
+        return sorted_events, lo, hi
+    
+    def _events_between(self, start_ms: float, end_ms: Optional[float] = None) -> List[Dict]:
+        """
+        Slice cached events with start_ms <= time < end_ms
+        
+        Returns:
+            List of access events in ascending time order
+        """
+        sorted_events, lo, hi = self._event_range(start_ms, end_ms)
+        return sorted_events[lo:hi]
+    
+    def _iter_events_between(self, start_ms: float, end_ms: Optional[float] = None) -> Iterator[Dict]:
+        """
+        Iterate cached events with start_ms <= time < end_ms without copying the range
+        
+        Yields:
+            Access events in ascending time order
+        """
+        sorted_events, lo, hi = self._event_range(start_ms, end_ms)
+        for i in range(lo, hi):
+            yield sorted_events[i]
     
     # ========== NEW: GET SINGLE ACCESS EVENT BY GUID ==========
     
@@ -229,23 +517,47 @@ class AltaClient:
         endpoint = f"/api/v1/accessEvents/{guid}"
         
         try:
-            logger.info(f"Fetching access event with GUID: {guid}")
+            logger.info("Fetching access event with GUID: %s", guid)
             response = self._make_request('GET', endpoint)
             
             if response:
-                logger.info(f"Retrieved access event: {guid}")
+                logger.info("Retrieved access event: %s", guid)
                 return response
             
-            logger.warning(f"Access event not found: {guid}")
+            logger.warning("Access event not found: %s", guid)
             return None
             
         except AltaAPIError as e:
             if "not found" in str(e).lower():
-                logger.warning(f"Access event not found: {guid}")
+                logger.warning("Access event not found: %s", guid)
                 return None
-            logger.error(f"Failed to get access event {guid}: {str(e)}")
+            logger.error("Failed to get access event %s: %s", guid, e)
             raise
     
+    def get_access_events_by_guids(self, guids: List[str]) -> List[Optional[Dict]]:
+        """
+        Get several access events by GUID, fetched concurrently
+        
+        Args:
+            guids: List of access event GUIDs
+            
+        Returns:
+            List of access event dictionaries (None for GUIDs not found), in input order
+            
+        Raises:
+            AltaAPIError: On API errors or network issues
+        """
+        if not guids:
+            return []
+        
+        # The session's connection pool (32) and the request slots cover every worker
+        with ThreadPoolExecutor(max_workers=min(self._FANOUT_WORKERS, len(guids))) as executor:
+            events = list(executor.map(self.get_access_event_by_guid, guids))
+        
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Retrieved %d of %d access events by GUID", sum(1 for e in events if e), len(guids))
+        return events
+    
     def get_entries_today(self) -> List[Dict]:
         """
         Get today's access events
@@ -256,16 +568,12 @@ class AltaClient:
         all_events = self.get_access_events()
         
         # Calculate today's start in UTC (00:00 UTC today)
-        today_start_utc = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_start_ms = int(today_start_utc.timestamp() * 1000)
+        today_start_ms, _ = _day_bounds_ms()
         
         # Filter events from 00:00 UTC today to now
-        today_events = [
-            event for event in all_events
-            if isinstance(event.get('time'), (int, float)) and event.get('time', 0) >= today_start_ms
-        ]
+        today_events = self._events_between(today_start_ms)
         
-        logger.info(f"[TODAY] Filtered {len(today_events)} events from today out of {len(all_events)} total (UTC boundary: {today_start_utc.isoformat()})")
+        logger.info("[TODAY] Filtered %d events from today out of %d total (UTC boundary: %s)", len(today_events), len(all_events), today_start_ms)
         return today_events
     
     def get_entries_yesterday(self) -> List[Dict]:
@@ -279,18 +587,11 @@ class AltaClient:
         
         # Calculate yesterday's time range in UTC
         # Yesterday: 00:00 UTC yesterday to 00:00 UTC today
-        today_start_utc = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        yesterday_start_utc = today_start_utc - timedelta(days=1)
+        yesterday_end_ms, yesterday_start_ms = _day_bounds_ms()
         
-        yesterday_start_ms = int(yesterday_start_utc.timestamp() * 1000)
-        yesterday_end_ms = int(today_start_utc.timestamp() * 1000)
+        yesterday_events = self._events_between(yesterday_start_ms, yesterday_end_ms)
         
-        yesterday_events = [
-            event for event in all_events
-            if isinstance(event.get('time'), (int, float)) and yesterday_start_ms <= event.get('time', 0) < yesterday_end_ms
-        ]
-        
-        logger.info(f"[YESTERDAY] Filtered {len(yesterday_events)} events from yesterday out of {len(all_events)} total (UTC range: {yesterday_start_utc.isoformat()} to {today_start_utc.isoformat()})")
+        logger.info("[YESTERDAY] Filtered %d events from yesterday out of %d total (UTC range: %s to %s)", len(yesterday_events), len(all_events), yesterday_start_ms, yesterday_end_ms)
         return yesterday_events
     
     def get_entries_last_n_days(self, days: int = 7) -> List[Dict]:
@@ -306,17 +607,51 @@ class AltaClient:
         all_events = self.get_access_events()
         
         # Calculate start time in epoch milliseconds (using current time, not UTC midnight)
-        start_time = datetime.utcnow() - timedelta(days=days)
-        start_time_ms = int(start_time.timestamp() * 1000)
+        start_time_ms = int(time.time() * 1000) - days * MS_PER_DAY
         
-        filtered_events = [
-            event for event in all_events
-            if isinstance(event.get('time'), (int, float)) and event.get('time', 0) >= start_time_ms
-        ]
+        filtered_events = self._events_between(start_time_ms)
         
-        logger.info(f"[LAST_{days}_DAYS] Filtered {len(filtered_events)} events from last {days} days out of {len(all_events)} total")
+        logger.info("[LAST_%s_DAYS] Filtered %d events from last %s days out of %d total", days, len(filtered_events), days, len(all_events))
         return filtered_events
     
+    # ========== LAZY DATE FILTERS ==========
+    # These yield the cached event dicts themselves; callers must not mutate them.
+    
+    def iter_entries_today(self) -> Iterator[Dict]:
+        """
+        Iterate today's access events without building a list
+        
+        Returns:
+            Iterator over today's access events
+        """
+        self.get_access_events()
+        today_start_ms, _ = _day_bounds_ms()
+        return self._iter_events_between(today_start_ms)
+    
+    def iter_entries_yesterday(self) -> Iterator[Dict]:
+        """
+        Iterate yesterday's access events without building a list
+        
+        Returns:
+            Iterator over yesterday's access events
+        """
+        self.get_access_events()
+        yesterday_end_ms, yesterday_start_ms = _day_bounds_ms()
+        return self._iter_events_between(yesterday_start_ms, yesterday_end_ms)
+    
+    def iter_entries_last_n_days(self, days: int = 7) -> Iterator[Dict]:
+        """
+        Iterate access events for the last N days without building a list
+        
+        Args:
+            days: Number of days to look back
+            
+        Returns:
+            Iterator over access events
+        """
+        self.get_access_events()
+        return self._iter_events_between(int(time.time() * 1000) - days * MS_PER_DAY)
+    
     def get_last_entry(self) -> Optional[Dict]:
         """
         Get the most recent access event
@@ -329,15 +664,14 @@ class AltaClient:
             logger.info("No access events available")
             return None
         
-        # Sort by time descending and return first
-        sorted_events = sorted(
-            events,
-            key=lambda x: x.get('time', 0),
-            reverse=True
-        )
+        # Events are indexed by time ascending, so the newest is last
+        sorted_events = self._event_index[0]
+        if not sorted_events:
+            logger.info("No timestamped access events, returning first event")
+            return events[0]
         
         logger.info("Retrieved most recent access event")
-        return sorted_events[0]
+        return sorted_events[-1]
     
     # ========== ACCESS POINTS (DOORS/READERS) ==========
     
@@ -351,16 +685,12 @@ class AltaClient:
         endpoint = "/api/v1/accessControlPoints"
         
         try:
-            response = self._make_request('GET', endpoint)
-            if not response:
-                return []
-            
-            # Handle both direct list and wrapped response
-            points = response if isinstance(response, list) else response.get('data', response.get('accessControlPoints', []))
-            logger.info(f"Retrieved {len(points)} access control points")
+            response = self._make_request('GET', endpoint, conditional=True)
+            points = self._unwrap_list(response, 'data', 'accessControlPoints')
+            logger.info("Retrieved %d access control points", len(points))
             return points
         except AltaAPIError as e:
-            logger.error(f"Failed to get access points: {str(e)}")
+            logger.error("Failed to get access points: %s", e)
             raise
     
     def get_available_access_points(self) -> List[Dict]:
@@ -373,16 +703,12 @@ class AltaClient:
         endpoint = "/api/v1/availableAccessPoints"
         
         try:
-            response = self._make_request('GET', endpoint)
-            if not response:
-                return []
-            
-            # Handle both direct list and wrapped response
-            points = response if isinstance(response, list) else response.get('data', response.get('availableAccessPoints', []))
-            logger.info(f"Retrieved {len(points)} available access points")
+            response = self._make_request('GET', endpoint, conditional=True)
+            points = self._unwrap_list(response, 'data', 'availableAccessPoints')
+            logger.info("Retrieved %d available access points", len(points))
             return points
         except AltaAPIError as e:
-            logger.error(f"Failed to get available access points: {str(e)}")
+            logger.error("Failed to get available access points: %s", e)
             raise
     
     # ========== NEW: UNLOCK ACCESS POINT ==========
@@ -403,61 +729,116 @@ class AltaClient:
         endpoint = f"/api/v1/accessControlPoints/{access_point_id}/unlock"
         
         try:
-            logger.info(f"Attempting to unlock access point: {access_point_id}")
+            logger.info("Attempting to unlock access point: %s", access_point_id)
             response = self._make_request('POST', endpoint)
             
-            logger.info(f"Successfully unlocked access point: {access_point_id}")
+            logger.info("Successfully unlocked access point: %s", access_point_id)
             return response if response else {}
             
         except AltaAPIError as e:
-            logger.error(f"Failed to unlock access point {access_point_id}: {str(e)}")
+            logger.error("Failed to unlock access point %s: %s", access_point_id, e)
             raise
     
     # ========== FILTERING HELPERS ==========
     
-    def filter_denied_entries(self, events: List[Dict]) -> List[Dict]:
+    @classmethod
+    def _is_denied(cls, event: Dict) -> bool:
+        """
+        Whether an event counts as a denied access attempt
+        
+        ACCESS_DENIED events, plus any event whose name mentions "failed" or
+        "denied"; HELD_OPEN events are never counted.
+        """
+        event_type = event.get('event_type', '')
+        
+        # Exclude HELD_OPEN events completely
+        if event_type in cls._EXCLUDED_DENIED_TYPES:
+            return False
+        
+        if event_type == 'ACCESS_DENIED':
+            return True
+        
+        event_name = event.get('_event_name_lc')
+        if event_name is None:
+            event_name = (event.get('event_name') or '').lower()
+        return 'failed' in event_name or 'denied' in event_name
+    
+    @staticmethod
+    def _is_granted(event: Dict) -> bool:
+        """Whether an event is a granted access"""
+        return event.get('event_type') == 'ACCESS_GRANTED'
+    
+    def filter_denied_entries(self, events: Iterable[Dict]) -> List[Dict]:
         """
         Filter events to only show denied access attempts
         
         Args:
-            events: List of event dictionaries
+            events: Event dictionaries (list or iterator, e.g. from iter_entries_today)
             
         Returns:
             List of denied events
         """
         denied_events = []
+        is_denied = self._is_denied
+        total = 0
         
         for event in events:
-            event_type = event.get('event_type', '')
-            event_name = event.get('event_name', '').lower()
-            
-            # Exclude HELD_OPEN events completely
-            if event_type in ['HELD_OPEN', 'HELD_OPEN_ENDED']:
-                continue
-            
-            # Include if ACCESS_DENIED or event_name contains "failed" or "denied"
-            if (event_type == 'ACCESS_DENIED' or 
-                'failed' in event_name or 
-                'denied' in event_name):
+            total += 1
+            if is_denied(event):
                 denied_events.append(event)
         
-        logger.info(f"[DENIED] Filtered {len(denied_events)} denied events from {len(events)} total")
+        logger.info("[DENIED] Filtered %d denied events from %d total", len(denied_events), total)
         return denied_events
     
-    def filter_granted_entries(self, events: List[Dict]) -> List[Dict]:
+    def filter_granted_entries(self, events: Iterable[Dict]) -> List[Dict]:
         """
         Filter events to only show granted access
         
         Args:
-            events: List of event dictionaries
+            events: Event dictionaries (list or iterator, e.g. from iter_entries_today)
             
         Returns:
             List of granted events
         """
-        granted_events = [
-            event for event in events
-            if event.get('event_type') == 'ACCESS_GRANTED'
-        ]
+        granted_events = []
+        is_granted = self._is_granted
+        total = 0
         
-        logger.info(f"[GRANTED] Filtered {len(granted_events)} granted events from {len(events)} total")
+        for event in events:
+            total += 1
+            if is_granted(event):
+                granted_events.append(event)
+        
+        logger.info("[GRANTED] Filtered %d granted events from %d total", len(granted_events), total)
         return granted_events
+    
+    def partition_entries(self, events: Iterable[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Split events into denied and granted lists in a single pass
+        
+        Uses the same predicates as filter_denied_entries and
+        filter_granted_entries, so callers that need both views
+        only walk the events once.
+        
+        Args:
+            events: Event dictionaries (list or iterator, e.g. from iter_entries_today)
+            
+        Returns:
+            Tuple of (denied events, granted events)
+        """
+        denied_events = []
+        granted_events = []
+        is_denied = self._is_denied
+        is_granted = self._is_granted
+        total = 0
+        
+        for event in events:
+            total += 1
+            if is_granted(event):
+                granted_events.append(event)
+            if is_denied(event):
+                denied_events.append(event)
+        
+        logger.info("[PARTITION] Split %d events into %d denied / %d granted",
+                    total, len(denied_events), len(granted_events))
+        return denied_events, granted_events
@@ -4,10 +4,18 @@ Connects to real Alta/Avigilon Cloud APIs for access control management
 """
 
 import streamlit as st
+import heapq
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, List, Optional, Tuple
 from alta_client import AltaClient, AltaAPIError
+from intents import (
+    CANCEL_WORDS, CONFIRM_WORDS, INITIAL_SUGGESTIONS, INTENT_TABLE, NUMBER_RE, QUICK_ACTIONS,
+    classify_message, message_tokens
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -23,20 +31,45 @@ st.set_page_config(
 
 # ========== SESSION STATE INITIALIZATION ==========
 
+# Keep only the most recent turns so long-running sessions stay bounded
+HISTORY_MAXLEN = 500
+
+# Chat messages shown and replayed on every rerun; older turns are dropped whole
+MESSAGES_MAXLEN = 200
+
+# Conversation history is stored column-wise: one bounded deque per field
+HISTORY_FIELDS = ("timestamp", "user_message", "intent", "assistant_response")
+
+def new_conversation_history() -> Dict[str, deque]:
+    """Empty history with one deque per field in HISTORY_FIELDS"""
+    return {field: deque(maxlen=HISTORY_MAXLEN) for field in HISTORY_FIELDS}
+
 if "messages" not in st.session_state:
-    st.session_state.messages = []
+    st.session_state.messages = deque()  # Trimmed by add_chat_messages
+if "message_count" not in st.session_state:
+    st.session_state.message_count = 0  # Total messages; the list drops old turns
 if "conversation_history" not in st.session_state:
-    st.session_state.conversation_history = []
+    st.session_state.conversation_history = new_conversation_history()
+if "query_count" not in st.session_state:
+    st.session_state.query_count = 0  # Total queries; the history deque drops old turns
 if "last_intent" not in st.session_state:
     st.session_state.last_intent = None
 if "last_entries" not in st.session_state:
     st.session_state.last_entries = None
+if "entries_source_days" not in st.session_state:
+    st.session_state.entries_source_days = None  # Day window of last_entries (None for today/yesterday)
+if "entries_partition" not in st.session_state:
+    st.session_state.entries_partition = None  # (entries, denied, granted) for the current last_entries
 if "current_user" not in st.session_state:
     st.session_state.current_user = None
 if "api_client" not in st.session_state:
     st.session_state.api_client = None
+if "last_good_access_points" not in st.session_state:
+    st.session_state.last_good_access_points = None  # Served when the API is unreachable
+if "prefetch" not in st.session_state:
+    st.session_state.prefetch = None  # Futures from the startup cache warm-up
 if "frequent_questions" not in st.session_state:
-    st.session_state.frequent_questions = {}
+    st.session_state.frequent_questions = Counter()
 # ========== NEW: SESSION STATE FOR UNLOCK FLOW ==========
 if "pending_unlock" not in st.session_state:
     st.session_state.pending_unlock = None  # Stores {id, name} of door to unlock
@@ -45,8 +78,179 @@ if "pending_door_options" not in st.session_state:
 if "awaiting_confirmation" not in st.session_state:
     st.session_state.awaiting_confirmation = False  # Flag for confirmation state
 
+# ========== CACHED API READS ==========
+# Read-only endpoints shared by every session signed in with the same
+# credentials. The leading underscore keeps Streamlit from hashing the client
+# object, which also leaves it out of the cache key, so every wrapper takes
+# the client's tenant key (base URL, token digest) as a real argument.
+
+# Shortest entries TTL below; the client's own event cache is given the same
+# TTL so it never serves events older than the wrappers ask for
+EVENT_CACHE_TTL = 30
+
+Tenant = Tuple[str, str]
+
+def tenant_key(client: AltaClient) -> Tenant:
+    """Cache key for a client's organization and credentials, without the raw token"""
+    return client.base_url, client.token_digest
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_access_points(_client: AltaClient, tenant: Tenant) -> List[Dict]:
+    """Access control points, refreshed every 5 minutes"""
+    return _client.get_access_points()
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_door_index(_client: AltaClient, tenant: Tenant) -> Tuple[Dict[str, List[Dict]], List[Tuple[str, Dict]]]:
+    """
+    Lowercased-name lookups, built once per access point fetch
+    
+    Returns:
+        Tuple of (exact name -> access points, (name, access point) pairs in API order)
+    """
+    pairs = [
+        (point.get('name', point.get('access_point_name', '')).lower(), point)
+        for point in _cached_access_points(_client, tenant)
+    ]
+    exact = {}
+    for point_name, point in pairs:
+        exact.setdefault(point_name, []).append(point)
+    return exact, pairs
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_door_options(_client: AltaClient, tenant: Tenant) -> Tuple[str, List[Dict]]:
+    """
+    Numbered door list for the sidebar unlock flow, built once per access point fetch
+    
+    Returns:
+        Tuple of (formatted message, access points in the order listed)
+    """
+    all_points = _cached_access_points(_client, tenant)
+    
+    parts = [f"**Available Doors ({len(all_points)}):**\n\n"]
+    for idx, point in enumerate(all_points, 1):
+        point_name = point.get('name', point.get('access_point_name', 'Unknown'))
+        site = point.get('site_name', 'Unknown Site')
+        point_id = get_door_id(point)
+        parts.append(f"{idx}. **{point_name}** (Site: {site})\n")
+        if point_id:
+            parts.append(f"   ID: {point_id}\n")
+    
+    parts.append("\nWhich door would you like to unlock? (Enter the number or name)")
+    return "".join(parts), all_points
+
+def _utc_day() -> int:
+    """Current UTC day number; the client's today/yesterday windows roll over with it"""
+    return int(time.time() // 86400)
+
+@st.cache_data(ttl=EVENT_CACHE_TTL, show_spinner=False)
+def _cached_entries_today(_client: AltaClient, tenant: Tenant, utc_day: int) -> List[Dict]:
+    """Today's entries, refreshed every 30 seconds"""
+    return _client.get_entries_today()
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _cached_entries_yesterday(_client: AltaClient, tenant: Tenant, utc_day: int) -> List[Dict]:
+    """Yesterday's entries; only late-arriving events change them"""
+    return _client.get_entries_yesterday()
+
+@st.cache_data(ttl=120, show_spinner=False)
+def _cached_entries_last_n_days(_client: AltaClient, tenant: Tenant, days: int) -> List[Dict]:
+    """Entries from the last N days, refreshed every 2 minutes"""
+    return _client.get_entries_last_n_days(days)
+
+def access_points_with_fallback(client: AltaClient) -> Tuple[List[Dict], bool]:
+    """
+    Access points from the cache, or the last good list if the API is unreachable
+    
+    The fallback is kept per session and outside the cached function, so a
+    stale list is never stored in the shared cache for a whole TTL.
+    
+    Returns:
+        Tuple of (access points, whether they are stale)
+    """
+    try:
+        points = _cached_access_points(client, tenant_key(client))
+    except AltaAPIError as e:
+        stale = st.session_state.last_good_access_points
+        if stale is None:
+            raise
+        logger.warning("Serving last known access points, API unavailable: %s", e)
+        return stale, True
+    
+    st.session_state.last_good_access_points = points
+    return points, False
+
+def clear_cached_reads(client: AltaClient):
+    """
+    Drop all cached API reads so the next query hits the API
+    
+    Covers both layers: the st.cache_data wrappers and the client's own
+    event cache, which the entries wrappers read through.
+    """
+    client.invalidate_events()
+    _cached_access_points.clear()
+    _cached_door_index.clear()
+    _cached_door_options.clear()
+    _cached_entries_today.clear()
+    _cached_entries_yesterday.clear()
+    _cached_entries_last_n_days.clear()
+
 # ========== AUTHENTICATION & CLIENT INITIALIZATION ==========
 
+@st.cache_resource(show_spinner=False)
+def _build_client(base_url: str, api_token: str) -> AltaClient:
+    """
+    Build the Alta API client once per credentials
+    
+    Shared by every session using the same base URL and token, so a rotated
+    token gets a fresh client without a restart. Reads cached for the client
+    are keyed on tenant_key(client), the same credentials in digest form, so
+    a new token never sees data cached under the old one.
+    
+    The current user is fetched per session outside this cache: the client
+    keeps it after the first success, and a failed /me is retried instead
+    of pinning a placeholder.
+    """
+    return AltaClient(base_url, api_token, cache_ttl_seconds=EVENT_CACHE_TTL)
+
+@st.cache_resource
+def _prefetch_executor() -> ThreadPoolExecutor:
+    """Small process-wide pool for warming API data in the background"""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="alta-prefetch")
+
+def start_prefetch(client: AltaClient):
+    """
+    Warm the client's access point and event caches in parallel
+    
+    The pool threads have no ScriptRunContext, so they call the client
+    directly rather than the st.cache_data wrappers. Fetching the events
+    fills the client's event cache that every date-range query reads, and
+    fetching the access points stores their ETag, so the first door lookup
+    is a 304 revalidation instead of a full download.
+    """
+    executor = _prefetch_executor()
+    st.session_state.prefetch = [
+        executor.submit(client.get_access_points),
+        executor.submit(client.get_access_events),
+    ]
+
+def wait_for_prefetch():
+    """
+    Block until the startup prefetch is done, so a query doesn't duplicate it
+    
+    Call before any read of the cached access point or entries wrappers.
+    """
+    futures = st.session_state.prefetch
+    if not futures:
+        return
+    
+    st.session_state.prefetch = None
+    for future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            # The query that needs the data will fetch it and report the error
+            logger.warning("Prefetch failed: %s", e)
+
 def initialize_api_client():
     """
     Initialize Alta API client with credentials from secrets
@@ -58,19 +262,19 @@ def initialize_api_client():
     """
     try:
         # Load credentials from Streamlit secrets
-        base_url = st.secrets["alta"]["base_url"]
-        api_token = st.secrets["alta"]["api_token"]
-        
-        # Initialize client
-        client = AltaClient(base_url, api_token)
+        client = _build_client(
+            st.secrets["alta"]["base_url"],
+            st.secrets["alta"]["api_token"]
+        )
         
         # Get current user (optional - for display purposes)
         user = client.get_current_user()
         
         st.session_state.api_client = client
         st.session_state.current_user = user or {"name": "User"}
+        start_prefetch(client)
         
-        logger.info(f"Successfully authenticated")
+        logger.info("Successfully authenticated")
         return True
         
     except KeyError as e:
@@ -103,91 +307,55 @@ if st.session_state.api_client is None:
 
 def track_question(intent: str):
     """Track frequently asked questions"""
-    if intent in st.session_state.frequent_questions:
-        st.session_state.frequent_questions[intent] += 1
-    else:
-        st.session_state.frequent_questions[intent] = 1
+    st.session_state.frequent_questions[intent] += 1
 
 def get_most_frequent_questions(top_n: int = 3) -> List[str]:
     """Get the most frequently asked questions"""
-    sorted_questions = sorted(
-        st.session_state.frequent_questions.items(),
-        key=lambda x: x[1],
-        reverse=True
-    )
-    return [q[0] for q in sorted_questions[:top_n]]
-
-# ========== NEW: UNLOCK HELPER FUNCTIONS ==========
+    return [q for q, _ in st.session_state.frequent_questions.most_common(top_n)]
 
-def find_door_by_name(door_name: str, access_points: List[Dict]) -> List[Dict]:
+def partition_entries_cached(client: AltaClient, entries: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
     """
-    Find access points matching the given door name (case-insensitive contains)
+    Split entries into (denied, granted), reusing the last split for the same list
     
-    Args:
-        door_name: Name or partial name of the door
-        access_points: List of all access points
-        
-    Returns:
-        List of matching access points
+    Every fetch assigns a new list to last_entries, so an identity check is
+    enough to tell whether the stored partition is still current.
     """
-    door_name_lower = door_name.lower()
-    matches = []
+    cached = st.session_state.entries_partition
+    if cached is not None and cached[0] is entries:
+        return cached[1], cached[2]
     
-    for point in access_points:
-        point_name = point.get('name', point.get('access_point_name', '')).lower()
-        if door_name_lower in point_name:
-            matches.append(point)
-    
-    logger.info(f"Found {len(matches)} door(s) matching '{door_name}'")
-    return matches
+    denied, granted = client.partition_entries(entries)
+    st.session_state.entries_partition = (entries, denied, granted)
+    return denied, granted
 
-def extract_access_point_id(message: str) -> Optional[str]:
-    """
-    Extract access point ID from user message if present
-    
-    Args:
-        message: User message
-        
-    Returns:
-        Access point ID or None
-    """
-    # Look for patterns like "door 123", "access point 456", "id 789"
-    import re
-    patterns = [
-        r'door\s+(\d+)',
-        r'access\s+point\s+(\d+)',
-        r'id\s+(\d+)',
-        r'#(\d+)'
-    ]
-    
-    message_lower = message.lower()
-    for pattern in patterns:
-        match = re.search(pattern, message_lower)
-        if match:
-            return match.group(1)
-    
-    return None
+# ========== NEW: UNLOCK HELPER FUNCTIONS ==========
 
-def extract_door_name(message: str) -> Optional[str]:
+def get_door_id(point: Dict) -> Optional[str]:
+    """Access point ID under whichever field name the API used"""
+    return point.get('id') or point.get('accessPointId') or point.get('access_point_id')
+
+def find_door_by_name(door_name: str, door_index: Tuple[Dict[str, List[Dict]], List[Tuple[str, Dict]]]) -> List[Dict]:
     """
-    Extract door name from unlock request
+    Find access points matching the given door name (case-insensitive)
+    
+    An exact name match wins; otherwise every door whose name contains
+    door_name is returned.
     
     Args:
-        message: User message
+        door_name: Name or partial name of the door
+        door_index: (exact, pairs) lookups from _cached_door_index
         
     Returns:
-        Door name or None
+        List of matching access points
     """
-    # Remove common unlock keywords to get the door name
-    message_lower = message.lower()
-    
-    # Remove unlock-related phrases
-    for phrase in ['unlock', 'open', 'door', 'access point', 'the']:
-        message_lower = message_lower.replace(phrase, '')
+    door_name_lower = door_name.lower()
+    exact, pairs = door_index
+    matches = exact.get(door_name_lower)
+    if matches is None:
+        matches = [point for point_name, point in pairs if door_name_lower in point_name]
     
-    # Clean and return
-    door_name = message_lower.strip()
-    return door_name if door_name else None
+    logger.info("Found %d door(s) matching '%s'", len(matches), door_name)
+    return matches
 
 # ========== INTENT ANALYSIS ==========
 
@@ -201,40 +369,19 @@ def analyze_intent(user_message: str) -> Dict:
     Returns:
         Dictionary with intent, API details, and follow-up suggestions
     """
-    message_lower = user_message.lower()
-    
     # ========== NEW: CHECK FOR CONFIRMATION RESPONSES ==========
     if st.session_state.awaiting_confirmation:
         # User is responding to a confirmation prompt
-        if any(word in message_lower for word in ['yes', 'confirm', 'ok', 'yeah', 'sure', 'proceed']):
-            return {
-                "intent": "confirm_unlock",
-                "api": "unlock_access_point",
-                "params": {},
-                "uses_context": False,
-                "confidence_message": None,
-                "requires_confirmation": False,
-                "follow_up_suggestions": []
-            }
-        elif any(word in message_lower for word in ['no', 'cancel', 'stop', 'abort', 'nevermind']):
-            return {
-                "intent": "cancel_unlock",
-                "api": None,
-                "params": {},
-                "uses_context": False,
-                "confidence_message": None,
-                "requires_confirmation": False,
-                "follow_up_suggestions": [
-                    "What doors do I have access to?",
-                    "Show today's entries"
-                ]
-            }
+        tokens = message_tokens(user_message.lower())
+        if tokens & CONFIRM_WORDS:
+            return INTENT_TABLE["confirm_unlock"]
+        elif tokens & CANCEL_WORDS:
+            return INTENT_TABLE["cancel_unlock"]
     
     # ========== NEW: CHECK FOR DOOR SELECTION FROM OPTIONS ==========
     if st.session_state.pending_door_options:
         # User might be selecting from numbered options
-        import re
-        number_match = re.search(r'\b(\d+)\b', user_message)
+        number_match = NUMBER_RE.search(user_message)
         if number_match:
             return {
                 "intent": "select_door_option",
@@ -243,267 +390,92 @@ def analyze_intent(user_message: str) -> Dict:
                 "uses_context": False,
                 "confidence_message": None,
                 "requires_confirmation": False,
-                "follow_up_suggestions": []
-            }
-    
-    # ========== NEW: UNLOCK ACCESS POINT ==========
-    if any(phrase in message_lower for phrase in ['unlock', 'open door', 'unlock door', 'unlock access point']):
-        # Try to extract access point ID
-        access_point_id = extract_access_point_id(user_message)
-        
-        if access_point_id:
-            # Direct ID provided
-            return {
-                "intent": "unlock_by_id",
-                "api": "unlock_access_point",
-                "params": {"access_point_id": access_point_id},
-                "uses_context": False,
-                "confidence_message": f"Preparing to unlock access point {access_point_id}.",
-                "requires_confirmation": True,
-                "follow_up_suggestions": []
-            }
-        else:
-            # Try to extract door name
-            door_name = extract_door_name(user_message)
-            return {
-                "intent": "unlock_by_name",
-                "api": "unlock_access_point",
-                "params": {"door_name": door_name},
-                "uses_context": False,
-                "confidence_message": "Searching for matching door.",
-                "requires_confirmation": True,
-                "follow_up_suggestions": []
-            }
-    
-    # ========== NEW: GET ACCESS EVENT BY GUID ==========
-    if any(phrase in message_lower for phrase in ['event', 'access event', 'show event', 'event details']):
-        # Try to extract GUID (usually a UUID pattern)
-        import re
-        # Look for UUID pattern or any long alphanumeric string
-        guid_match = re.search(r'([a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12})', message_lower)
-        if not guid_match:
-            # Try alphanumeric pattern
-            guid_match = re.search(r'\b([a-zA-Z0-9]{20,})\b', user_message)
-        
-        if guid_match:
-            guid = guid_match.group(1)
-            return {
-                "intent": "get_event_by_guid",
-                "api": "get_access_event_by_guid",
-                "params": {"guid": guid},
-                "uses_context": False,
-                "confidence_message": f"Retrieving access event {guid}.",
-                "requires_confirmation": False,
-                "follow_up_suggestions": [
-                    "Show today's entries",
-                    "Show last 7 days"
-                ]
+                "follow_up_suggestions": ()
             }
     
-    # ===== ACCESS HISTORY (MUST BE FIRST TO CATCH ALL VARIATIONS) =====
-    if any(phrase in message_lower for phrase in ["access history", "my history", "access log", "entry log", "access logs", "entry logs"]):
-        return {
-            "intent": "get_entries_last_7_days",
-            "api": "get_entries_last_n_days",
-            "params": {"days": 7},
-            "uses_context": False,
-            "confidence_message": "Retrieving your access history from the last 7 days.",
-            "requires_confirmation": False,
-            "follow_up_suggestions": [
-                "Show only denied entries",
-                "Show only granted entries",
-                "What doors do I have access to?"
-            ]
-        }
-    
-    # ===== DOOR ACCESS QUERIES =====
-    elif any(word in message_lower for word in ["door", "doors", "access to", "which doors", "what doors", "access point"]):
-        return {
-            "intent": "get_access_points",
-            "api": "get_access_points",
-            "params": {},
-            "uses_context": False,
-            "confidence_message": "Retrieving your access control points.",
-            "requires_confirmation": False,
-            "follow_up_suggestions": [
-                "Show my access history",
-                "Where did I enter today?",
-                "Check for denied access"
-            ]
-        }
-    
-    # ===== ENTRY HISTORY - TODAY =====
-    elif any(phrase in message_lower for phrase in ["today", "entered today", "access today", "where did i enter today"]):
-        return {
-            "intent": "get_entries_today",
-            "api": "get_entries_today",
-            "params": {},
-            "uses_context": False,
-            "confidence_message": "Retrieving access entries from today.",
-            "requires_confirmation": False,
-            "follow_up_suggestions": [
-                "Show yesterday's entries",
-                "Show last 7 days",
-                "What doors do I have access to?"
-            ]
-        }
-    
-    # ===== ENTRY HISTORY - YESTERDAY =====
-    elif any(word in message_lower for word in ["yesterday", "entered yesterday"]):
-        return {
-            "intent": "get_entries_yesterday",
-            "api": "get_entries_yesterday",
-            "params": {},
-            "uses_context": False,
-            "confidence_message": "Retrieving access entries from yesterday.",
-            "requires_confirmation": False,
-            "follow_up_suggestions": [
-                "Show today's entries",
-                "Show last 7 days",
-                "Check for denied access"
-            ]
-        }
-    
-    # ===== ENTRY HISTORY - LAST N DAYS =====
-    elif any(phrase in message_lower for phrase in ["last 7 days", "last week", "past week", "last seven days"]):
-        return {
-            "intent": "get_entries_last_7_days",
-            "api": "get_entries_last_n_days",
-            "params": {"days": 7},
-            "uses_context": False,
-            "confidence_message": "Retrieving access entries from the last 7 days.",
-            "requires_confirmation": False,
-            "follow_up_suggestions": [
-                "Show only denied entries",
-                "Show only granted entries",
-                "What doors do I have access to?"
-            ]
-        }
-    
-    elif any(phrase in message_lower for phrase in ["last 30 days", "last month", "past month"]):
-        return {
-            "intent": "get_entries_last_30_days",
-            "api": "get_entries_last_n_days",
-            "params": {"days": 30},
-            "uses_context": False,
-            "confidence_message": "Retrieving access entries from the last 30 days.",
-            "requires_confirmation": False,
-            "follow_up_suggestions": [
-                "Show only denied entries",
-                "Show only granted entries",
-                "Filter by specific door"
-            ]
-        }
-    
-    # ===== LAST ENTRY =====
-    elif any(phrase in message_lower for phrase in ["last entry", "last access", "most recent", "last time"]):
-        return {
-            "intent": "get_last_entry",
-            "api": "get_last_entry",
-            "params": {},
-            "uses_context": False,
-            "confidence_message": "Retrieving your most recent access entry.",
-            "requires_confirmation": False,
-            "follow_up_suggestions": [
-                "Show today's entries",
-                "Show last 7 days",
-                "What doors do I have access to?"
-            ]
-        }
-    
-    # ===== DENIED ACCESS =====
-    elif any(phrase in message_lower for phrase in ["denied", "denied access", "rejected", "failed access", "couldn't enter"]):
-        return {
-            "intent": "get_denied_entries",
-            "api": "filter_denied_entries",
-            "params": {},
-            "uses_context": True,
-            "confidence_message": "Checking for denied access attempts.",
-            "requires_confirmation": False,
-            "follow_up_suggestions": [
-                "Show all entries",
-                "Show granted entries only",
-                "What doors do I have access to?"
-            ]
-        }
-    
-    # ===== GRANTED ACCESS =====
-    elif any(phrase in message_lower for phrase in ["granted", "successful", "granted access", "successful access"]):
-        return {
-            "intent": "get_granted_entries",
-            "api": "filter_granted_entries",
-            "params": {},
-            "uses_context": True,
-            "confidence_message": "Retrieving successful access entries.",
-            "requires_confirmation": False,
-            "follow_up_suggestions": [
-                "Show denied entries",
-                "Show today's entries",
-                "Check last entry"
-            ]
-        }
-    
-    # ===== ACCOUNT INFO =====
-    elif any(phrase in message_lower for phrase in ["my account", "my profile", "my info", "who am i"]):
-        return {
-            "intent": "show_account",
-            "api": None,
-            "params": {},
-            "uses_context": False,
-            "confidence_message": None,
-            "requires_confirmation": False,
-            "follow_up_suggestions": [
-                "What doors do I have access to?",
-                "Show my access history",
-                "Check for denied access"
-            ]
-        }
-    
-    # ===== HELP =====
-    elif any(word in message_lower for word in ["help", "what can you do", "capabilities", "commands"]):
-        return {
-            "intent": "show_help",
-            "api": None,
-            "params": {},
-            "uses_context": False,
-            "confidence_message": None,
-            "requires_confirmation": False,
-            "follow_up_suggestions": [
-                "What doors do I have access to?",
-                "Show today's entries",
-                "Show my account"
-            ]
-        }
-    
-    # ===== DEBUG: SHOW DOOR STRUCTURE =====
-    elif "debug doors" in message_lower or "door structure" in message_lower:
-        return {
-            "intent": "debug_doors",
-            "api": None,
-            "params": {},
-            "uses_context": False,
-            "confidence_message": None,
-            "requires_confirmation": False,
-            "follow_up_suggestions": []
-        }
-    
-    # ===== UNSUPPORTED =====
-    else:
-        return {
-            "intent": "unsupported",
-            "api": None,
-            "params": {},
-            "uses_context": False,
-            "confidence_message": None,
-            "requires_confirmation": False,
-            "follow_up_suggestions": [
-                "What doors do I have access to?",
-                "Show today's entries",
-                "Show my access history"
-            ]
-        }
+    # ========== CONTEXT-FREE CLASSIFICATION (cached per distinct message) ==========
+    return classify_message(user_message)
 
 # ========== API CALL EXECUTION ==========
+# One handler per "api" value in the intent tables; each takes the client
+# and the intent params and returns the response dictionary
+
+def _api_access_points(client: AltaClient, params) -> Dict:
+    points, stale = access_points_with_fallback(client)
+    return {"success": True, "data": points, "type": "access_points", "stale": stale}
+
+def _api_entries_today(client: AltaClient, params) -> Dict:
+    entries = _cached_entries_today(client, tenant_key(client), _utc_day())
+    st.session_state.last_entries = entries
+    st.session_state.entries_source_days = None
+    return {"success": True, "data": entries, "type": "entries"}
+
+def _api_entries_yesterday(client: AltaClient, params) -> Dict:
+    entries = _cached_entries_yesterday(client, tenant_key(client), _utc_day())
+    st.session_state.last_entries = entries
+    st.session_state.entries_source_days = None
+    return {"success": True, "data": entries, "type": "entries"}
+
+def _api_entries_last_n_days(client: AltaClient, params) -> Dict:
+    days = params.get("days", 7)
+    entries = _cached_entries_last_n_days(client, tenant_key(client), days)
+    st.session_state.last_entries = entries
+    st.session_state.entries_source_days = days
+    return {"success": True, "data": entries, "type": "entries", "days": days}
+
+def _api_last_entry(client: AltaClient, params) -> Dict:
+    entry = client.get_last_entry()
+    return {"success": True, "data": [entry] if entry else [], "type": "entries"}
+
+def _context_entries(client: AltaClient) -> List[Dict]:
+    """Entries from the previous query, or the last 7 days if there are none"""
+    if st.session_state.last_entries:
+        return st.session_state.last_entries
+    
+    entries = _cached_entries_last_n_days(client, tenant_key(client), 7)
+    st.session_state.last_entries = entries
+    st.session_state.entries_source_days = 7
+    return entries
+
+def _api_filter_denied(client: AltaClient, params) -> Dict:
+    denied, _ = partition_entries_cached(client, _context_entries(client))
+    return {"success": True, "data": denied, "type": "entries",
+            "days": st.session_state.entries_source_days, "filter": "denied"}
+
+def _api_filter_granted(client: AltaClient, params) -> Dict:
+    _, granted = partition_entries_cached(client, _context_entries(client))
+    return {"success": True, "data": granted, "type": "entries",
+            "days": st.session_state.entries_source_days, "filter": "granted"}
+
+def _api_unlock(client: AltaClient, params) -> Dict:
+    access_point_id = params.get("access_point_id")
+    if not access_point_id:
+        return {"success": False, "error": "No access point ID provided"}
+    
+    result = client.unlock_access_point(access_point_id)
+    return {"success": True, "data": result, "type": "unlock", "access_point_id": access_point_id}
+
+def _api_event_by_guid(client: AltaClient, params) -> Dict:
+    guid = params.get("guid")
+    if not guid:
+        return {"success": False, "error": "No GUID provided"}
+    
+    event = client.get_access_event_by_guid(guid)
+    if event:
+        return {"success": True, "data": [event], "type": "entries"}
+    return {"success": False, "error": f"Access event with GUID {guid} not found"}
+
+_API_DISPATCH = {
+    "get_access_points": _api_access_points,
+    "get_entries_today": _api_entries_today,
+    "get_entries_yesterday": _api_entries_yesterday,
+    "get_entries_last_n_days": _api_entries_last_n_days,
+    "get_last_entry": _api_last_entry,
+    "filter_denied_entries": _api_filter_denied,
+    "filter_granted_entries": _api_filter_granted,
+    "unlock_access_point": _api_unlock,
+    "get_access_event_by_guid": _api_event_by_guid,
+}
 
 def execute_api_call(intent_data: Dict) -> Dict:
     """
@@ -515,90 +487,16 @@ def execute_api_call(intent_data: Dict) -> Dict:
     Returns:
         API response or error dictionary
     """
-    client = st.session_state.api_client
-    
-    intent = intent_data.get("intent")
-    api_method = intent_data.get("api")
-    params = intent_data.get("params", {})
+    handler = _API_DISPATCH.get(intent_data.get("api"))
+    if handler is None:
+        return {"success": False, "error": "Unknown API method"}
     
     try:
-        # ===== ACCESS POINTS =====
-        if api_method == "get_access_points":
-            points = client.get_access_points()
-            return {"success": True, "data": points, "type": "access_points"}
-        
-        # ===== TODAY'S ENTRIES =====
-        elif api_method == "get_entries_today":
-            entries = client.get_entries_today()
-            st.session_state.last_entries = entries
-            return {"success": True, "data": entries, "type": "entries"}
-        
-        # ===== YESTERDAY'S ENTRIES =====
-        elif api_method == "get_entries_yesterday":
-            entries = client.get_entries_yesterday()
-            st.session_state.last_entries = entries
-            return {"success": True, "data": entries, "type": "entries"}
-        
-        # ===== LAST N DAYS =====
-        elif api_method == "get_entries_last_n_days":
-            days = params.get("days", 7)
-            entries = client.get_entries_last_n_days(days)
-            st.session_state.last_entries = entries
-            return {"success": True, "data": entries, "type": "entries", "days": days}
-        
-        # ===== LAST ENTRY =====
-        elif api_method == "get_last_entry":
-            entry = client.get_last_entry()
-            return {"success": True, "data": [entry] if entry else [], "type": "entries"}
-        
-        # ===== FILTER DENIED =====
-        elif api_method == "filter_denied_entries":
-            if st.session_state.last_entries:
-                entries = st.session_state.last_entries
-            else:
-                entries = client.get_entries_last_n_days(7)
-                st.session_state.last_entries = entries
-            
-            denied = client.filter_denied_entries(entries)
-            return {"success": True, "data": denied, "type": "entries"}
-        
-        # ===== FILTER GRANTED =====
-        elif api_method == "filter_granted_entries":
-            if st.session_state.last_entries:
-                entries = st.session_state.last_entries
-            else:
-                entries = client.get_entries_last_n_days(7)
-                st.session_state.last_entries = entries
-            
-            granted = client.filter_granted_entries(entries)
-            return {"success": True, "data": granted, "type": "entries"}
-        
-        # ========== NEW: UNLOCK ACCESS POINT ==========
-        elif api_method == "unlock_access_point":
-            access_point_id = params.get("access_point_id")
-            if access_point_id:
-                result = client.unlock_access_point(access_point_id)
-                return {"success": True, "data": result, "type": "unlock", "access_point_id": access_point_id}
-            else:
-                return {"success": False, "error": "No access point ID provided"}
-        
-        # ========== NEW: GET ACCESS EVENT BY GUID ==========
-        elif api_method == "get_access_event_by_guid":
-            guid = params.get("guid")
-            if guid:
-                event = client.get_access_event_by_guid(guid)
-                if event:
-                    return {"success": True, "data": [event], "type": "entries"}
-                else:
-                    return {"success": False, "error": f"Access event with GUID {guid} not found"}
-            else:
-                return {"success": False, "error": "No GUID provided"}
-        
-        else:
-            return {"success": False, "error": "Unknown API method"}
-            
+        wait_for_prefetch()
+        return handler(st.session_state.api_client, intent_data.get("params", {}))
+    
     except AltaAPIError as e:
-        logger.error(f"API call failed: {str(e)}")
+        logger.error("API call failed: %s", e)
         return {"success": False, "error": str(e)}
     except Exception as e:
         logger.exception("Unexpected error during API call")
@@ -606,6 +504,28 @@ def execute_api_call(intent_data: Dict) -> Dict:
 
 # ========== RESPONSE FORMATTING ==========
 
+# Upper bound for plausible event times (~year 2096, in epoch milliseconds)
+MAX_EPOCH_MS = 4_000_000_000_000
+
+# Display labels for known event types; anything else is shown as-is
+ENTRY_STATUS_TEXT = {
+    'ACCESS_GRANTED': "Granted",
+    'ACCESS_DENIED': "Denied",
+    'HELD_OPEN': "Held Open",
+}
+
+def _first(record: Dict, keys: Tuple[str, ...], default=''):
+    """
+    Value of the first key present in record
+    
+    Same result as record.get(k1, record.get(k2, default)), without
+    evaluating the fallback lookups when the first key is there.
+    """
+    for key in keys:
+        if key in record:
+            return record[key]
+    return default
+
 def format_access_points_response(points: List[Dict]) -> str:
     """
     Format access control points response
@@ -619,89 +539,111 @@ def format_access_points_response(points: List[Dict]) -> str:
     if not points:
         return "No access control points found in the system."
     
-    response = f"**Access Control Points (Doors): {len(points)}**\n\n"
+    rows = [
+        (
+            _first(point, ('name', 'access_point_name'), 'Unknown Point'),
+            _first(point, ('site_name', 'site'), 'Unknown Site'),
+            point.get('type', 'Access Point'),
+            get_door_id(point) or 'N/A',
+        )
+        for point in points
+    ]
+    
+    header = f"**Access Control Points (Doors): {len(points)}**\n\n"
+    return header + "".join(
+        f"**{name}**\n   Site: {site}\n   Type: {point_type}\n   ID: {point_id}\n\n"
+        for name, site, point_type, point_id in rows
+    )
+
+def format_entry_time(time_ms) -> str:
+    """
+    Format an epoch-milliseconds timestamp as local time
     
-    for point in points:
-        name = point.get('name', point.get('access_point_name', 'Unknown Point'))
-        site = point.get('site_name', point.get('site', 'Unknown Site'))
-        point_type = point.get('type', 'Access Point')
-        # Try multiple possible ID field names
-        point_id = point.get('id') or point.get('accessPointId') or point.get('access_point_id') or 'N/A'
+    Args:
+        time_ms: Event time from the API (epoch milliseconds)
         
-        response += f"**{name}**\n"
-        response += f"   Site: {site}\n"
-        response += f"   Type: {point_type}\n"
-        response += f"   ID: {point_id}\n\n"
+    Returns:
+        'YYYY-MM-DD HH:MM:SS', or "Unknown time" for missing/out-of-range values
+    """
+    # The range check keeps localtime() inside what every platform accepts,
+    # so no exception handling is needed on the per-entry path
+    if isinstance(time_ms, (int, float)) and 0 < time_ms < MAX_EPOCH_MS:
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time_ms / 1000))
+    return "Unknown time"
+
+def _most_recent(entries: List[Dict], n: int) -> List[Dict]:
+    """
+    The n most recent entries, newest first
     
-    return response
+    Same result as sorted(entries, key=time, reverse=True)[:n]. The client
+    returns date-range queries in ascending time order, so already-ordered
+    input is handled with a slice after one linear check.
+    """
+    times = [entry.get('time', 0) for entry in entries]
+    
+    if all(a >= b for a, b in zip(times, islice(times, 1, None))):
+        return entries[:n]
+    if all(a < b for a, b in zip(times, islice(times, 1, None))):
+        # Strictly ascending: no ties whose relative order a reversal could flip
+        return entries[:-n - 1:-1]
+    
+    # Unordered input: select without sorting everything
+    return heapq.nlargest(n, entries, key=lambda x: x.get('time', 0))
 
-def format_entry_response(entries: List[Dict], days: Optional[int] = None) -> str:
+def format_entry_response(entries: List[Dict], days: Optional[int] = None,
+                          filter_name: Optional[str] = None) -> str:
     """
     Format access entry response
     
     Args:
         entries: List of entry dictionaries
-        days: Number of days (for context in message)
+        days: Number of days the entries cover (for context in message);
+            filtered results pass the window of the entries they came from
+        filter_name: "denied" or "granted" when entries were filtered, so an
+            empty result doesn't claim the whole window had no events
         
     Returns:
         Formatted string
     """
     if not entries:
+        if filter_name:
+            if days:
+                return f"No {filter_name} access events in the last {days} days."
+            return f"No {filter_name} access events were found in the selected period."
         if days:
             return f"No access events recorded in the last {days} days."
         return "No denied access events were found in the selected period."
     
-    # Sort by timestamp (most recent first)
-    sorted_entries = sorted(
-        entries,
-        key=lambda x: x.get('time', 0),
-        reverse=True
-    )
+    recent_entries = _most_recent(entries, 20)
     
-    response = f"**Access Events: {len(entries)}**\n\n"
+    parts = [f"**Access Events: {len(entries)}**\n\n"]
     
-    for entry in sorted_entries[:20]:  # Limit to 20 most recent
+    for entry in recent_entries:
         # Extract entry details
-        time_ms = entry.get('time', 0)
-        door_name = entry.get('access_point_name', entry.get('reader_name', 'Unknown Door'))
-        site = entry.get('site_name', 'Unknown Site')
-        event_type = entry.get('event_type', 'UNKNOWN')
-        cardholder = entry.get('cardholder_name', '')
-        guid = entry.get('guid', entry.get('id', ''))
+        get = entry.get
+        time_ms = get('time', 0)
+        door_name = _first(entry, ('access_point_name', 'reader_name'), 'Unknown Door')
+        site = get('site_name', 'Unknown Site')
+        event_type = get('event_type', 'UNKNOWN')
+        cardholder = get('cardholder_name', '')
+        guid = _first(entry, ('guid', 'id'), '')
         
         # Determine access status based strictly on event_type
-        if event_type == 'ACCESS_GRANTED':
-            status_text = "Granted"
-        elif event_type == 'ACCESS_DENIED':
-            status_text = "Denied"
-        elif event_type == 'HELD_OPEN':
-            status_text = "Held Open"
-        else:
-            status_text = event_type
+        status_text = ENTRY_STATUS_TEXT.get(event_type, event_type)
         
-        # Convert epoch milliseconds to datetime
-        try:
-            if isinstance(time_ms, (int, float)) and time_ms > 0:
-                dt = datetime.fromtimestamp(time_ms / 1000)
-                time_str = dt.strftime('%Y-%m-%d %H:%M:%S')
-            else:
-                time_str = "Unknown time"
-        except:
-            time_str = "Unknown time"
-        
-        response += f"**{status_text}** - {door_name}\n"
-        response += f"   Site: {site}\n"
-        response += f"   Time: {time_str}\n"
+        parts.append(f"**{status_text}** - {door_name}\n")
+        parts.append(f"   Site: {site}\n")
+        parts.append(f"   Time: {format_entry_time(time_ms)}\n")
         if cardholder:
-            response += f"   User: {cardholder}\n"
+            parts.append(f"   User: {cardholder}\n")
         if guid:
-            response += f"   Event ID: {guid}\n"
-        response += "\n"
+            parts.append(f"   Event ID: {guid}\n")
+        parts.append("\n")
     
-    if len(sorted_entries) > 20:
-        response += f"\nShowing 20 of {len(sorted_entries)} entries"
+    if len(entries) > 20:
+        parts.append(f"\nShowing 20 of {len(entries)} entries")
     
-    return response
+    return "".join(parts)
 
 def format_account_response(user: Dict) -> str:
     """
@@ -713,182 +655,24 @@ def format_account_response(user: Dict) -> str:
     Returns:
         Formatted string
     """
-    response = "**Your Account:**\n\n"
+    parts = ["**Your Account:**\n\n"]
     
     name = user.get('name', user.get('firstName', '') + ' ' + user.get('lastName', '')).strip()
     email = user.get('email', 'Not available')
     user_id = user.get('id', 'Not available')
     role = user.get('role', user.get('userRole', 'User'))
     
-    response += f"**Name:** {name or 'Not available'}\n"
-    response += f"**Email:** {email}\n"
+    parts.append(f"**Name:** {name or 'Not available'}\n")
+    parts.append(f"**Email:** {email}\n")
     if user_id != 'Not available':
-        response += f"**User ID:** {user_id}\n"
-    response += f"**Role:** {role.title()}\n"
+        parts.append(f"**User ID:** {user_id}\n")
+    parts.append(f"**Role:** {role.title()}\n")
     
-    return response
+    return "".join(parts)
 
 # ========== RESPONSE GENERATION ==========
 
-def generate_response(intent_data: Dict) -> str:
-    """
-    Generate assistant response based on intent
-    
-    Args:
-        intent_data: Intent analysis result
-        
-    Returns:
-        Formatted response string
-    """
-    intent = intent_data.get("intent")
-    
-    # Track question
-    track_question(intent)
-    
-    # ========== NEW: CANCEL UNLOCK ==========
-    if intent == "cancel_unlock":
-        st.session_state.pending_unlock = None
-        st.session_state.pending_door_options = None
-        st.session_state.awaiting_confirmation = False
-        return "Unlock cancelled. How else can I help you?"
-    
-    # ========== NEW: SELECT DOOR FROM OPTIONS ==========
-    if intent == "select_door_option":
-        selection = intent_data["params"]["selection"]
-        options = st.session_state.pending_door_options
-        
-        if not options or selection < 1 or selection > len(options):
-            st.session_state.pending_door_options = None
-            return "Invalid selection. Please try again or specify the door name."
-        
-        selected_door = options[selection - 1]
-        door_name = selected_door.get('name', selected_door.get('access_point_name', 'Unknown Door'))
-        # Try multiple possible ID field names
-        door_id = selected_door.get('id') or selected_door.get('accessPointId') or selected_door.get('access_point_id')
-        
-        if not door_id:
-            logger.error(f"No ID found for door: {selected_door}")
-            st.session_state.pending_door_options = None
-            return f"Error: Could not find ID for {door_name}. Available fields: {list(selected_door.keys())}"
-        
-        # Store pending unlock and request confirmation
-        st.session_state.pending_unlock = {"id": door_id, "name": door_name}
-        st.session_state.pending_door_options = None
-        st.session_state.awaiting_confirmation = True
-        
-        return f"You selected **{door_name}**.\n\nDo you want me to unlock this door? (yes/no)"
-    
-    # ========== NEW: CONFIRM UNLOCK ==========
-    if intent == "confirm_unlock":
-        if not st.session_state.pending_unlock:
-            st.session_state.awaiting_confirmation = False
-            return "No unlock operation pending. Please specify which door to unlock."
-        
-        door_id = st.session_state.pending_unlock["id"]
-        door_name = st.session_state.pending_unlock["name"]
-        
-        # Execute unlock
-        try:
-            client = st.session_state.api_client
-            client.unlock_access_point(door_id)
-            
-            # Clear pending state
-            st.session_state.pending_unlock = None
-            st.session_state.awaiting_confirmation = False
-            
-            return f"Successfully unlocked **{door_name}**!"
-        
-        except AltaAPIError as e:
-            st.session_state.pending_unlock = None
-            st.session_state.awaiting_confirmation = False
-            return f"Failed to unlock door: {str(e)}"
-    
-    # ========== NEW: UNLOCK BY ID ==========
-    if intent == "unlock_by_id":
-        access_point_id = intent_data["params"]["access_point_id"]
-        
-        # Get access point name for confirmation
-        try:
-            client = st.session_state.api_client
-            all_points = client.get_access_points()
-            # Try to match by multiple possible ID field names
-            matching_point = None
-            for p in all_points:
-                point_id = p.get('id') or p.get('accessPointId') or p.get('access_point_id')
-                if str(point_id) == access_point_id:
-                    matching_point = p
-                    break
-            
-            if matching_point:
-                door_name = matching_point.get('name', matching_point.get('access_point_name', f'Door {access_point_id}'))
-            else:
-                door_name = f"Access Point {access_point_id}"
-            
-            # Store pending unlock and request confirmation
-            st.session_state.pending_unlock = {"id": access_point_id, "name": door_name}
-            st.session_state.awaiting_confirmation = True
-            
-            return f"Do you want me to unlock **{door_name}**? (yes/no)"
-        
-        except Exception as e:
-            logger.error(f"Error finding access point: {e}")
-            # Store anyway for unlock
-            st.session_state.pending_unlock = {"id": access_point_id, "name": f"Access Point {access_point_id}"}
-            st.session_state.awaiting_confirmation = True
-            return f"Do you want me to unlock access point {access_point_id}? (yes/no)"
-    
-    # ========== NEW: UNLOCK BY NAME ==========
-    if intent == "unlock_by_name":
-        door_name = intent_data["params"].get("door_name")
-        
-        if not door_name:
-            return "Please specify which door you want to unlock."
-        
-        # Search for matching doors
-        try:
-            client = st.session_state.api_client
-            all_points = client.get_access_points()
-            matches = find_door_by_name(door_name, all_points)
-            
-            if len(matches) == 0:
-                return f"No doors found matching '{door_name}'. Please check the door name and try again."
-            
-            elif len(matches) == 1:
-                # Single match - request confirmation
-                matched_door = matches[0]
-                matched_name = matched_door.get('name', matched_door.get('access_point_name', 'Unknown Door'))
-                # Try multiple possible ID field names
-                matched_id = matched_door.get('id') or matched_door.get('accessPointId') or matched_door.get('access_point_id')
-                
-                if not matched_id:
-                    logger.error(f"No ID found for door: {matched_door}")
-                    return f"Error: Could not find ID for {matched_name}. Available fields: {list(matched_door.keys())}"
-                
-                st.session_state.pending_unlock = {"id": matched_id, "name": matched_name}
-                st.session_state.awaiting_confirmation = True
-                
-                return f"Found door: **{matched_name}**\n\nDo you want me to unlock this door? (yes/no)"
-            
-            else:
-                # Multiple matches - ask user to choose
-                st.session_state.pending_door_options = matches
-                
-                response = f"Found {len(matches)} doors matching '{door_name}':\n\n"
-                for idx, point in enumerate(matches, 1):
-                    point_name = point.get('name', point.get('access_point_name', 'Unknown'))
-                    site = point.get('site_name', 'Unknown Site')
-                    response += f"{idx}. **{point_name}** (Site: {site})\n"
-                
-                response += "\nPlease enter the number of the door you want to unlock."
-                return response
-        
-        except Exception as e:
-            logger.error(f"Error searching for doors: {e}")
-            return f"Error searching for doors: {str(e)}"
-    
-    # ===== HELP =====
-    if intent == "show_help":
-        return """**Available Commands:**
+HELP_TEXT = """**Available Commands:**
 
 **Door Access:**
 - "What doors do I have access to?"
@@ -915,40 +699,8 @@ def generate_response(intent_data: Dict) -> str:
 - "Who am I?"
 
 Ask me a question to get started."""
-    
-    # ===== ACCOUNT INFO =====
-    elif intent == "show_account":
-        user = st.session_state.current_user
-        return format_account_response(user)
-    
-    # ===== DEBUG DOORS =====
-    elif intent == "debug_doors":
-        try:
-            client = st.session_state.api_client
-            all_points = client.get_access_points()
-            
-            if not all_points:
-                return "No access points found."
-            
-            # Show structure of first door
-            first_door = all_points[0]
-            response = "**First Door Structure:**\n\n"
-            response += f"```json\n{first_door}\n```\n\n"
-            response += f"**Available Keys:** {list(first_door.keys())}\n\n"
-            
-            # Try to identify which field might be the ID
-            response += "**Potential ID fields:**\n"
-            for key, value in first_door.items():
-                if 'id' in key.lower() or key in ['guid', 'uuid', 'key']:
-                    response += f"- {key}: {value}\n"
-            
-            return response
-        except Exception as e:
-            return f"Error getting door structure: {str(e)}"
-    
-    # ===== UNSUPPORTED =====
-    elif intent == "unsupported":
-        return """Request not recognized.
+
+UNSUPPORTED_TEXT = """Request not recognized.
 
 Available functions:
 - Access control points
@@ -959,6 +711,219 @@ Available functions:
 - Account information
 
 Please rephrase your request."""
+
+# One handler per intent answered without an API call; each takes the
+# intent data and returns the response text
+
+def _respond_cancel_unlock(intent_data: Dict) -> str:
+    """Drop any pending unlock or door choice"""
+    st.session_state.pending_unlock = None
+    st.session_state.pending_door_options = None
+    st.session_state.awaiting_confirmation = False
+    return "Unlock cancelled. How else can I help you?"
+
+def _respond_select_door_option(intent_data: Dict) -> str:
+    """Ask to confirm the door picked from the numbered options"""
+    selection = intent_data["params"]["selection"]
+    options = st.session_state.pending_door_options
+    
+    if not options or selection < 1 or selection > len(options):
+        st.session_state.pending_door_options = None
+        return "Invalid selection. Please try again or specify the door name."
+    
+    selected_door = options[selection - 1]
+    door_name = selected_door.get('name', selected_door.get('access_point_name', 'Unknown Door'))
+    door_id = get_door_id(selected_door)
+    
+    if not door_id:
+        logger.error("No ID found for door: %s", selected_door)
+        st.session_state.pending_door_options = None
+        return f"Error: Could not find ID for {door_name}. Available fields: {list(selected_door.keys())}"
+    
+    # Store pending unlock and request confirmation
+    st.session_state.pending_unlock = {"id": door_id, "name": door_name}
+    st.session_state.pending_door_options = None
+    st.session_state.awaiting_confirmation = True
+    
+    return f"You selected **{door_name}**.\n\nDo you want me to unlock this door? (yes/no)"
+
+def _respond_confirm_unlock(intent_data: Dict) -> str:
+    """Unlock the pending door"""
+    if not st.session_state.pending_unlock:
+        st.session_state.awaiting_confirmation = False
+        return "No unlock operation pending. Please specify which door to unlock."
+    
+    door_id = st.session_state.pending_unlock["id"]
+    door_name = st.session_state.pending_unlock["name"]
+    
+    # Execute unlock
+    try:
+        client = st.session_state.api_client
+        client.unlock_access_point(door_id)
+        
+        # Clear pending state
+        st.session_state.pending_unlock = None
+        st.session_state.awaiting_confirmation = False
+        
+        return f"Successfully unlocked **{door_name}**!"
+    
+    except AltaAPIError as e:
+        st.session_state.pending_unlock = None
+        st.session_state.awaiting_confirmation = False
+        return f"Failed to unlock door: {str(e)}"
+
+def _respond_unlock_by_id(intent_data: Dict) -> str:
+    """Ask to confirm unlocking the access point with the given ID"""
+    access_point_id = intent_data["params"]["access_point_id"]
+    
+    # Get access point name for confirmation
+    try:
+        wait_for_prefetch()
+        all_points, _ = access_points_with_fallback(st.session_state.api_client)
+        matching_point = next(
+            (p for p in all_points if str(get_door_id(p)) == access_point_id),
+            None
+        )
+        
+        if matching_point:
+            door_name = matching_point.get('name', matching_point.get('access_point_name', f'Door {access_point_id}'))
+        else:
+            door_name = f"Access Point {access_point_id}"
+        
+        # Store pending unlock and request confirmation
+        st.session_state.pending_unlock = {"id": access_point_id, "name": door_name}
+        st.session_state.awaiting_confirmation = True
+        
+        return f"Do you want me to unlock **{door_name}**? (yes/no)"
+    
+    except Exception as e:
+        logger.error("Error finding access point: %s", e)
+        # Store anyway for unlock
+        st.session_state.pending_unlock = {"id": access_point_id, "name": f"Access Point {access_point_id}"}
+        st.session_state.awaiting_confirmation = True
+        return f"Do you want me to unlock access point {access_point_id}? (yes/no)"
+
+def _respond_unlock_by_name(intent_data: Dict) -> str:
+    """Ask to confirm the matching door, or to pick between several"""
+    door_name = intent_data["params"].get("door_name")
+    
+    if not door_name:
+        return "Please specify which door you want to unlock."
+    
+    # Search for matching doors
+    try:
+        client = st.session_state.api_client
+        wait_for_prefetch()
+        door_index = _cached_door_index(client, tenant_key(client))
+        matches = find_door_by_name(door_name, door_index)
+        
+        if len(matches) == 0:
+            return f"No doors found matching '{door_name}'. Please check the door name and try again."
+        
+        elif len(matches) == 1:
+            # Single match - request confirmation
+            matched_door = matches[0]
+            matched_name = matched_door.get('name', matched_door.get('access_point_name', 'Unknown Door'))
+            matched_id = get_door_id(matched_door)
+            
+            if not matched_id:
+                logger.error("No ID found for door: %s", matched_door)
+                return f"Error: Could not find ID for {matched_name}. Available fields: {list(matched_door.keys())}"
+            
+            st.session_state.pending_unlock = {"id": matched_id, "name": matched_name}
+            st.session_state.awaiting_confirmation = True
+            
+            return f"Found door: **{matched_name}**\n\nDo you want me to unlock this door? (yes/no)"
+        
+        else:
+            # Multiple matches - ask user to choose
+            st.session_state.pending_door_options = matches
+            
+            parts = [f"Found {len(matches)} doors matching '{door_name}':\n\n"]
+            parts.extend(
+                f"{idx}. **{point.get('name', point.get('access_point_name', 'Unknown'))}**"
+                f" (Site: {point.get('site_name', 'Unknown Site')})\n"
+                for idx, point in enumerate(matches, 1)
+            )
+            parts.append("\nPlease enter the number of the door you want to unlock.")
+            return "".join(parts)
+    
+    except Exception as e:
+        logger.error("Error searching for doors: %s", e)
+        return f"Error searching for doors: {str(e)}"
+
+def _respond_help(intent_data: Dict) -> str:
+    """Static list of supported commands"""
+    return HELP_TEXT
+
+def _respond_account(intent_data: Dict) -> str:
+    """Current user's account details"""
+    user = st.session_state.current_user
+    return format_account_response(user)
+
+def _respond_debug_doors(intent_data: Dict) -> str:
+    """Raw structure of the first access point, for finding its ID field"""
+    try:
+        client = st.session_state.api_client
+        wait_for_prefetch()
+        all_points = _cached_access_points(client, tenant_key(client))
+        
+        if not all_points:
+            return "No access points found."
+        
+        # Show structure of first door
+        first_door = all_points[0]
+        parts = [
+            "**First Door Structure:**\n\n",
+            f"```json\n{first_door}\n```\n\n",
+            f"**Available Keys:** {list(first_door.keys())}\n\n",
+            # Try to identify which field might be the ID
+            "**Potential ID fields:**\n"
+        ]
+        parts.extend(
+            f"- {key}: {value}\n"
+            for key, value in first_door.items()
+            if 'id' in key.lower() or key in ('guid', 'uuid', 'key')
+        )
+        
+        return "".join(parts)
+    except Exception as e:
+        return f"Error getting door structure: {str(e)}"
+
+def _respond_unsupported(intent_data: Dict) -> str:
+    """Reply for messages no intent matched"""
+    return UNSUPPORTED_TEXT
+
+_RESPONSE_HANDLERS = {
+    "cancel_unlock": _respond_cancel_unlock,
+    "select_door_option": _respond_select_door_option,
+    "confirm_unlock": _respond_confirm_unlock,
+    "unlock_by_id": _respond_unlock_by_id,
+    "unlock_by_name": _respond_unlock_by_name,
+    "show_help": _respond_help,
+    "show_account": _respond_account,
+    "debug_doors": _respond_debug_doors,
+    "unsupported": _respond_unsupported,
+}
+
+def generate_response(intent_data: Dict) -> str:
+    """
+    Generate assistant response based on intent
+    
+    Args:
+        intent_data: Intent analysis result
+        
+    Returns:
+        Formatted response string
+    """
+    intent = intent_data.get("intent")
+    
+    # Track question
+    track_question(intent)
+    
+    handler = _RESPONSE_HANDLERS.get(intent)
+    if handler:
+        return handler(intent_data)
     
     # ===== API-BASED INTENTS =====
     confidence_message = intent_data.get("confidence_message")
@@ -979,10 +944,12 @@ Please rephrase your request."""
     response_type = api_response.get("type")
     
     if response_type == "access_points":
+        if api_response.get("stale"):
+            response += "_Alta API is unavailable; showing the last known list of doors._\n\n"
         response += format_access_points_response(data)
     elif response_type == "entries":
         days = api_response.get("days")
-        response += format_entry_response(data, days)
+        response += format_entry_response(data, days, api_response.get("filter"))
     elif response_type == "unlock":
         access_point_id = api_response.get("access_point_id")
         response += f"Successfully unlocked access point {access_point_id}!"
@@ -993,6 +960,35 @@ Please rephrase your request."""
 
 # ========== UI COMPONENTS ==========
 
+# Shown before the first message; {name} is the signed-in user's name
+GREETING_TEMPLATE = """Hello {name}.
+
+Alta Video access control assistant. Available functions:
+
+**Door Access** - View accessible doors and access points
+**Unlock Doors** - Remotely unlock access points
+**Entry History** - View access event logs
+**Denied Access** - Check failed access attempts
+**Account Info** - View account details
+
+What would you like to know?"""
+
+def add_chat_messages(*messages: Dict):
+    """
+    Append chat messages, dropping the oldest past MESSAGES_MAXLEN
+    
+    A dropped user message takes its reply with it, so the list never starts
+    with an answer to a question that is no longer shown.
+    """
+    chat = st.session_state.messages
+    chat.extend(messages)
+    st.session_state.message_count += len(messages)
+    
+    while len(chat) > MESSAGES_MAXLEN:
+        dropped = chat.popleft()
+        if dropped["role"] == "user" and chat:
+            chat.popleft()
+
 def display_follow_up_suggestions(suggestions: List[str]):
     """Display follow-up suggestions as clickable buttons"""
     if suggestions and len(suggestions) > 0:
@@ -1000,38 +996,49 @@ def display_follow_up_suggestions(suggestions: List[str]):
         st.markdown("**Quick actions:**")
         
         cols = st.columns(min(len(suggestions), 3))
+        message_count = st.session_state.message_count
         
         for idx, suggestion in enumerate(suggestions):
             with cols[idx % 3]:
+                # Compact key; str hashes are stable for the life of the process
                 if st.button(
                     suggestion,
-                    key=f"suggest_{suggestion}_{len(st.session_state.messages)}",
+                    key=f"sg_{hash((suggestion, message_count)) & 0xffffffff:x}",
                     use_container_width=True
                 ):
                     process_user_message(suggestion)
                     st.rerun()
 
-def process_user_message(message: str):
-    """Process a user message and generate response"""
-    st.session_state.messages.append({"role": "user", "content": message})
+def process_user_message(message: str, intent_data: Optional[Dict] = None):
+    """
+    Process a user message and generate response
     
-    intent_data = analyze_intent(message)
+    Args:
+        message: User's message, as shown in the chat
+        intent_data: Intent to use instead of analyzing the message
+    """
+    if intent_data is None:
+        intent_data = analyze_intent(message)
     st.session_state.last_intent = intent_data.get("intent")
     
     assistant_response = generate_response(intent_data)
     
-    st.session_state.messages.append({
-        "role": "assistant",
-        "content": assistant_response,
-        "suggestions": intent_data.get("follow_up_suggestions", [])
-    })
+    # Nothing above reads the message list, so both turns go in with one write
+    add_chat_messages(
+        {"role": "user", "content": message},
+        {
+            "role": "assistant",
+            "content": assistant_response,
+            "suggestions": intent_data.get("follow_up_suggestions", [])
+        }
+    )
     
-    st.session_state.conversation_history.append({
-        "timestamp": datetime.now().isoformat(),
-        "user_message": message,
-        "intent": intent_data.get("intent"),
-        "assistant_response": assistant_response
-    })
+    st.session_state.query_count += 1
+    history = st.session_state.conversation_history
+    history["timestamp"].append(time.time_ns())  # Epoch nanoseconds; format at display time if ever needed
+    history["user_message"].append(message)
+    history["intent"].append(intent_data.get("intent"))
+    history["assistant_response"].append(assistant_response)
 
 # ========== NEW: UNLOCK DOOR FLOW FUNCTION ==========
 
@@ -1039,42 +1046,29 @@ def initiate_unlock_door_flow():
     """Initiate the unlock door flow from sidebar button"""
     try:
         client = st.session_state.api_client
-        all_points = client.get_access_points()
+        wait_for_prefetch()
+        response, all_points = _cached_door_options(client, tenant_key(client))
         
         if not all_points:
             process_user_message("No doors available")
             return
         
         # Log the structure of the first door for debugging
-        if all_points:
-            logger.info(f"Sample door structure: {all_points[0]}")
-            logger.info(f"Available keys: {list(all_points[0].keys())}")
-        
-        # Show available doors
-        response = f"**Available Doors ({len(all_points)}):**\n\n"
-        for idx, point in enumerate(all_points, 1):
-            point_name = point.get('name', point.get('access_point_name', 'Unknown'))
-            site = point.get('site_name', 'Unknown Site')
-            # Try to find and display ID
-            point_id = point.get('id') or point.get('accessPointId') or point.get('access_point_id')
-            response += f"{idx}. **{point_name}** (Site: {site})\n"
-            if point_id:
-                response += f"   ID: {point_id}\n"
-        
-        response += "\nWhich door would you like to unlock? (Enter the number or name)"
+        logger.info("Sample door structure: %s", all_points[0])
+        logger.info("Available keys: %s", list(all_points[0]))
         
         # Store options for selection
         st.session_state.pending_door_options = all_points
         
         # Add to chat
-        st.session_state.messages.append({
+        add_chat_messages({
             "role": "assistant",
             "content": response,
             "suggestions": []
         })
         
     except Exception as e:
-        logger.error(f"Error initiating unlock flow: {e}")
+        logger.error("Error initiating unlock flow: %s", e)
         process_user_message("Error loading doors")
 
 # ========== MAIN APP ==========
@@ -1090,8 +1084,8 @@ with st.sidebar:
         user = st.session_state.current_user
         st.success(f"User: {user.get('name', user.get('email', 'User'))}")
     
-    st.metric("Messages", len(st.session_state.messages))
-    st.metric("Queries", len(st.session_state.conversation_history))
+    st.metric("Messages", st.session_state.message_count)
+    st.metric("Queries", st.session_state.query_count)
     
     if st.session_state.last_intent:
         st.info(f"Last Intent: {st.session_state.last_intent}")
@@ -1108,17 +1102,12 @@ with st.sidebar:
     
     st.subheader("Quick Actions")
     
-    if st.button("My Doors", use_container_width=True):
-        process_user_message("What doors do I have access to?")
-        st.rerun()
-    
-    if st.button("Today's Entries", use_container_width=True):
-        process_user_message("Show today's entries")
-        st.rerun()
-    
-    if st.button("Denied Access", use_container_width=True):
-        process_user_message("Show denied access attempts")
-        st.rerun()
+    for label, prompt_text in QUICK_ACTIONS.items():
+        if st.button(label, use_container_width=True):
+            # A button press is never a reply to a pending confirmation or door
+            # choice, so go straight to the cached context-free classifier
+            process_user_message(prompt_text, classify_message(prompt_text))
+            st.rerun()
     
     # ========== NEW: UNLOCK DOOR BUTTON ==========
     if st.button("Unlock Door", use_container_width=True):
@@ -1128,13 +1117,18 @@ with st.sidebar:
     st.divider()
     
     if st.button("Clear Chat", use_container_width=True):
-        st.session_state.messages = []
-        st.session_state.conversation_history = []
+        st.session_state.messages = deque()
+        st.session_state.message_count = 0
+        st.session_state.conversation_history = new_conversation_history()
+        st.session_state.query_count = 0
         st.session_state.last_intent = None
         st.session_state.last_entries = None
+        st.session_state.entries_source_days = None
+        st.session_state.entries_partition = None
         st.session_state.pending_unlock = None
         st.session_state.pending_door_options = None
         st.session_state.awaiting_confirmation = False
+        clear_cached_reads(st.session_state.api_client)
         st.rerun()
 
 # Display chat messages
@@ -1152,52 +1146,19 @@ if len(st.session_state.messages) == 0:
         user = st.session_state.current_user
         name = user.get('name', user.get('firstName', 'there'))
         
-        greeting = f"""Hello {name}.
-
-Alta Video access control assistant. Available functions:
-
-**Door Access** - View accessible doors and access points
-**Unlock Doors** - Remotely unlock access points
-**Entry History** - View access event logs
-**Denied Access** - Check failed access attempts
-**Account Info** - View account details
-
-What would you like to know?"""
+        greeting = GREETING_TEMPLATE.format(name=name)
         
         st.markdown(greeting)
         
-        initial_suggestions = [
-            "What doors do I have access to?",
-            "Show today's entries",
-            "Show my account"
-        ]
-        display_follow_up_suggestions(initial_suggestions)
+        display_follow_up_suggestions(INITIAL_SUGGESTIONS)
 
 # Chat input
 if prompt := st.chat_input("Ask me about your access..."):
     with st.chat_message("user"):
         st.markdown(prompt)
     
+    # Same path as suggestion buttons; the replay loop renders the result after the rerun
     with st.chat_message("assistant"):
         with st.spinner("Processing..."):
-            intent_data = analyze_intent(prompt)
-            st.session_state.last_intent = intent_data.get("intent")
-            
-            assistant_response = generate_response(intent_data)
-            st.markdown(assistant_response)
-            
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": assistant_response,
-                "suggestions": intent_data.get("follow_up_suggestions", [])
-            })
-            
-            st.session_state.conversation_history.append({
-                "timestamp": datetime.now().isoformat(),
-                "user_message": prompt,
-                "intent": intent_data.get("intent"),
-                "assistant_response": assistant_response
-            })
-            
-            display_follow_up_suggestions(intent_data.get("follow_up_suggestions", []))
+            process_user_message(prompt)
+    st.rerun()
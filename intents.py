@@ -0,0 +1,488 @@
+"""
+Alta Video Assistant - Intent Tables
+Keyword-to-intent mapping and static intent payloads used by analyze_intent
+
+Kept outside app.py so the tables and compiled patterns are built once per
+process instead of on every Streamlit rerun.
+"""
+
+import re
+import sys
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
+
+# ========== TRIGGER PHRASES ==========
+
+# Checked before the keyword intents; each is a single compiled alternation
+UNLOCK_TRIGGER_RE = re.compile(
+    "|".join(map(re.escape, ["unlock", "open door", "unlock door", "unlock access point"]))
+)
+EVENT_TRIGGER_RE = re.compile(
+    "|".join(map(re.escape, ["event", "access event", "show event", "event details"]))
+)
+
+# Access point IDs in unlock requests, tried in order
+_ID_PATTERNS = tuple(re.compile(p) for p in (
+    r'door\s+(\d+)',
+    r'access\s+point\s+(\d+)',
+    r'id\s+(\d+)',
+    r'#(\d+)'
+))
+
+# Event GUIDs: a UUID, or failing that any long alphanumeric token
+_UUID_RE = re.compile(r'([a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12})')
+_LONG_ALNUM_RE = re.compile(r'\b([a-zA-Z0-9]{20,})\b')
+
+# Unlock wording stripped from a request to leave the door name; word
+# boundaries keep names such as "theater" or "reopened wing" intact
+_UNLOCK_STRIP_RE = re.compile(r'\b(?:unlock|open|doors?|access point|the)\b')
+
+# Numbered choice when picking from a list of matching doors
+NUMBER_RE = re.compile(r'\b(\d+)\b')
+
+# Replies to an unlock confirmation prompt, matched as whole words so that
+# e.g. "look" or "know" are not read as "ok" / "no"
+CONFIRM_WORDS = frozenset({"y", "yes", "confirm", "confirmed", "ok", "okay", "yeah", "sure", "proceed"})
+CANCEL_WORDS = frozenset({"n", "no", "nope", "cancel", "stop", "abort", "nevermind"})
+
+# Only the confirm/cancel replies are matched on tokens. The single-word
+# keyword intents below are not: token sets would stop "backdoor" or
+# "helpful" from matching, and _KEYWORD_RE already replaces the per-phrase scans
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def message_tokens(message_lower: str) -> frozenset:
+    """Split a lowercased message into its set of word tokens"""
+    return frozenset(_TOKEN_RE.findall(message_lower))
+
+# ========== KEYWORD INTENTS ==========
+
+# Keyword intents in priority order: if phrases from several intents appear
+# in a message, the intent listed first wins (same order as the original
+# if/elif chain in analyze_intent)
+KEYWORD_INTENTS = (
+    # Access history (must be first to catch all variations)
+    ("access_history", (
+        "access history", "my history", "access log", "entry log", "access logs", "entry logs"
+    )),
+    ("get_access_points", (
+        "door", "doors", "access to", "which doors", "what doors", "access point"
+    )),
+    ("get_entries_today", (
+        "today", "entered today", "access today", "where did i enter today"
+    )),
+    ("get_entries_yesterday", (
+        "yesterday", "entered yesterday"
+    )),
+    ("get_entries_last_7_days", (
+        "last 7 days", "last week", "past week", "last seven days"
+    )),
+    ("get_entries_last_30_days", (
+        "last 30 days", "last month", "past month"
+    )),
+    ("get_last_entry", (
+        "last entry", "last access", "most recent", "last time"
+    )),
+    ("get_denied_entries", (
+        "denied", "denied access", "rejected", "failed access", "couldn't enter"
+    )),
+    ("get_granted_entries", (
+        "granted", "successful", "granted access", "successful access"
+    )),
+    ("show_account", (
+        "my account", "my profile", "my info", "who am i"
+    )),
+    ("show_help", (
+        "help", "what can you do", "capabilities", "commands"
+    )),
+    ("debug_doors", (
+        "debug doors", "door structure"
+    )),
+)
+
+# One scan over the message: the lookahead makes every start position a
+# candidate, and at each position the alternation tries intents in priority order.
+# Phrases match as plain substrings (no \b), like the `phrase in message` checks
+# they replaced, so a keyword inside a longer word ("backdoor") still counts.
+_KEYWORD_RE = re.compile(
+    "(?=" + "|".join(
+        f"(?P<{key}>{'|'.join(map(re.escape, phrases))})"
+        for key, phrases in KEYWORD_INTENTS
+    ) + ")"
+)
+_KEYWORD_PRIORITY = {key: rank for rank, (key, _) in enumerate(KEYWORD_INTENTS)}
+
+
+def match_keyword_intent(message_lower: str) -> Optional[str]:
+    """
+    Find the highest-priority keyword intent mentioned in a message
+
+    Phrases match anywhere in the message, including inside longer words.
+
+    Args:
+        message_lower: Lowercased user message
+
+    Returns:
+        Key into INTENT_TABLE, or None if no keyword matched
+    """
+    best_key = None
+    best_rank = len(KEYWORD_INTENTS)
+
+    for match in _KEYWORD_RE.finditer(message_lower):
+        key = match.lastgroup
+        rank = _KEYWORD_PRIORITY[key]
+        if rank < best_rank:
+            best_key, best_rank = key, rank
+            if rank == 0:
+                break
+
+    return best_key
+
+
+# ========== STATIC INTENT PAYLOADS ==========
+
+_INTENT_PAYLOADS = {
+    # Confirmation replies while an unlock is pending
+    "confirm_unlock": {
+        "intent": "confirm_unlock",
+        "api": "unlock_access_point",
+        "params": {},
+        "uses_context": False,
+        "confidence_message": None,
+        "requires_confirmation": False,
+        "follow_up_suggestions": ()
+    },
+    "cancel_unlock": {
+        "intent": "cancel_unlock",
+        "api": None,
+        "params": {},
+        "uses_context": False,
+        "confidence_message": None,
+        "requires_confirmation": False,
+        "follow_up_suggestions": (
+            "What doors do I have access to?",
+            "Show today's entries"
+        )
+    },
+    "access_history": {
+        "intent": "get_entries_last_7_days",
+        "api": "get_entries_last_n_days",
+        "params": {"days": 7},
+        "uses_context": False,
+        "confidence_message": "Retrieving your access history from the last 7 days.",
+        "requires_confirmation": False,
+        "follow_up_suggestions": (
+            "Show only denied entries",
+            "Show only granted entries",
+            "What doors do I have access to?"
+        )
+    },
+    "get_access_points": {
+        "intent": "get_access_points",
+        "api": "get_access_points",
+        "params": {},
+        "uses_context": False,
+        "confidence_message": "Retrieving your access control points.",
+        "requires_confirmation": False,
+        "follow_up_suggestions": (
+            "Show my access history",
+            "Where did I enter today?",
+            "Check for denied access"
+        )
+    },
+    "get_entries_today": {
+        "intent": "get_entries_today",
+        "api": "get_entries_today",
+        "params": {},
+        "uses_context": False,
+        "confidence_message": "Retrieving access entries from today.",
+        "requires_confirmation": False,
+        "follow_up_suggestions": (
+            "Show yesterday's entries",
+            "Show last 7 days",
+            "What doors do I have access to?"
+        )
+    },
+    "get_entries_yesterday": {
+        "intent": "get_entries_yesterday",
+        "api": "get_entries_yesterday",
+        "params": {},
+        "uses_context": False,
+        "confidence_message": "Retrieving access entries from yesterday.",
+        "requires_confirmation": False,
+        "follow_up_suggestions": (
+            "Show today's entries",
+            "Show last 7 days",
+            "Check for denied access"
+        )
+    },
+    "get_entries_last_7_days": {
+        "intent": "get_entries_last_7_days",
+        "api": "get_entries_last_n_days",
+        "params": {"days": 7},
+        "uses_context": False,
+        "confidence_message": "Retrieving access entries from the last 7 days.",
+        "requires_confirmation": False,
+        "follow_up_suggestions": (
+            "Show only denied entries",
+            "Show only granted entries",
+            "What doors do I have access to?"
+        )
+    },
+    "get_entries_last_30_days": {
+        "intent": "get_entries_last_30_days",
+        "api": "get_entries_last_n_days",
+        "params": {"days": 30},
+        "uses_context": False,
+        "confidence_message": "Retrieving access entries from the last 30 days.",
+        "requires_confirmation": False,
+        "follow_up_suggestions": (
+            "Show only denied entries",
+            "Show only granted entries",
+            "Filter by specific door"
+        )
+    },
+    "get_last_entry": {
+        "intent": "get_last_entry",
+        "api": "get_last_entry",
+        "params": {},
+        "uses_context": False,
+        "confidence_message": "Retrieving your most recent access entry.",
+        "requires_confirmation": False,
+        "follow_up_suggestions": (
+            "Show today's entries",
+            "Show last 7 days",
+            "What doors do I have access to?"
+        )
+    },
+    "get_denied_entries": {
+        "intent": "get_denied_entries",
+        "api": "filter_denied_entries",
+        "params": {},
+        "uses_context": True,
+        "confidence_message": "Checking for denied access attempts.",
+        "requires_confirmation": False,
+        "follow_up_suggestions": (
+            "Show all entries",
+            "Show granted entries only",
+            "What doors do I have access to?"
+        )
+    },
+    "get_granted_entries": {
+        "intent": "get_granted_entries",
+        "api": "filter_granted_entries",
+        "params": {},
+        "uses_context": True,
+        "confidence_message": "Retrieving successful access entries.",
+        "requires_confirmation": False,
+        "follow_up_suggestions": (
+            "Show denied entries",
+            "Show today's entries",
+            "Check last entry"
+        )
+    },
+    "show_account": {
+        "intent": "show_account",
+        "api": None,
+        "params": {},
+        "uses_context": False,
+        "confidence_message": None,
+        "requires_confirmation": False,
+        "follow_up_suggestions": (
+            "What doors do I have access to?",
+            "Show my access history",
+            "Check for denied access"
+        )
+    },
+    "show_help": {
+        "intent": "show_help",
+        "api": None,
+        "params": {},
+        "uses_context": False,
+        "confidence_message": None,
+        "requires_confirmation": False,
+        "follow_up_suggestions": (
+            "What doors do I have access to?",
+            "Show today's entries",
+            "Show my account"
+        )
+    },
+    "debug_doors": {
+        "intent": "debug_doors",
+        "api": None,
+        "params": {},
+        "uses_context": False,
+        "confidence_message": None,
+        "requires_confirmation": False,
+        "follow_up_suggestions": ()
+    },
+    "unsupported": {
+        "intent": "unsupported",
+        "api": None,
+        "params": {},
+        "uses_context": False,
+        "confidence_message": None,
+        "requires_confirmation": False,
+        "follow_up_suggestions": (
+            "What doors do I have access to?",
+            "Show today's entries",
+            "Show my access history"
+        )
+    },
+}
+
+
+def _freeze(payload: Dict) -> Mapping:
+    """Wrap an intent payload (and its params) in read-only views"""
+    return MappingProxyType({**payload, "params": MappingProxyType(payload["params"])})
+
+
+# Payloads are returned by reference on every call, so expose them read-only
+INTENT_TABLE: Mapping[str, Mapping] = MappingProxyType({
+    key: _freeze(payload) for key, payload in _INTENT_PAYLOADS.items()
+})
+
+
+# ========== MESSAGE HELPERS ==========
+
+def extract_access_point_id(message_lower: str) -> Optional[str]:
+    """
+    Extract access point ID from user message if present
+    
+    Args:
+        message_lower: Lowercased user message
+        
+    Returns:
+        Access point ID or None
+    """
+    # Look for patterns like "door 123", "access point 456", "id 789"
+    for pattern in _ID_PATTERNS:
+        match = pattern.search(message_lower)
+        if match:
+            return match.group(1)
+    
+    return None
+
+
+def extract_door_name(message_lower: str) -> Optional[str]:
+    """
+    Extract door name from unlock request
+    
+    Args:
+        message_lower: Lowercased user message
+        
+    Returns:
+        Door name or None
+    """
+    # Remove common unlock keywords (whole words only) to get the door name
+    door_name = _UNLOCK_STRIP_RE.sub('', message_lower).strip()
+    return door_name if door_name else None
+
+
+# ========== CONTEXT-FREE CLASSIFICATION ==========
+
+@lru_cache(maxsize=256)
+def classify_message(user_message: str) -> Mapping:
+    """
+    Classify a message that does not depend on pending unlock state
+
+    Results are cached per distinct message; quick-action buttons and
+    follow-up suggestions resend the same few phrases over and over.
+
+    Args:
+        user_message: User's natural language query
+
+    Returns:
+        Read-only intent payload
+    """
+    # Lowercased once here and shared by every check below; cache hits skip it entirely
+    message_lower = sys.intern(user_message.lower())
+    
+    # ========== NEW: UNLOCK ACCESS POINT ==========
+    if UNLOCK_TRIGGER_RE.search(message_lower):
+        # Try to extract access point ID
+        access_point_id = extract_access_point_id(message_lower)
+    
+        if access_point_id:
+            # Direct ID provided
+            return _freeze({
+                "intent": "unlock_by_id",
+                "api": "unlock_access_point",
+                "params": {"access_point_id": access_point_id},
+                "uses_context": False,
+                "confidence_message": f"Preparing to unlock access point {access_point_id}.",
+                "requires_confirmation": True,
+                "follow_up_suggestions": ()
+            })
+        else:
+            # Try to extract door name
+            door_name = extract_door_name(message_lower)
+            return _freeze({
+                "intent": "unlock_by_name",
+                "api": "unlock_access_point",
+                "params": {"door_name": door_name},
+                "uses_context": False,
+                "confidence_message": "Searching for matching door.",
+                "requires_confirmation": True,
+                "follow_up_suggestions": ()
+            })
+
+    # ========== NEW: GET ACCESS EVENT BY GUID ==========
+    if EVENT_TRIGGER_RE.search(message_lower):
+        # Try to extract GUID (usually a UUID pattern)
+        # Look for UUID pattern or any long alphanumeric string
+        guid_match = _UUID_RE.search(message_lower)
+        if not guid_match:
+            # Try alphanumeric pattern
+            guid_match = _LONG_ALNUM_RE.search(user_message)
+    
+        if guid_match:
+            guid = guid_match.group(1)
+            return _freeze({
+                "intent": "get_event_by_guid",
+                "api": "get_access_event_by_guid",
+                "params": {"guid": guid},
+                "uses_context": False,
+                "confidence_message": f"Retrieving access event {guid}.",
+                "requires_confirmation": False,
+                "follow_up_suggestions": (
+                    "Show today's entries",
+                    "Show last 7 days"
+                )
+            })
+
+    # ===== KEYWORD INTENTS (access history, doors, dates, filters, account, help) =====
+    # Single pass over the message; ties resolve in the table's priority order
+    intent_key = match_keyword_intent(message_lower)
+    return INTENT_TABLE[intent_key or "unsupported"]
+
+
+# ========== CANNED UI PHRASES ==========
+
+# Sidebar quick action buttons: label -> message sent to the chat
+QUICK_ACTIONS = {
+    "My Doors": "What doors do I have access to?",
+    "Today's Entries": "Show today's entries",
+    "Denied Access": "Show denied access attempts",
+}
+
+# Quick actions shown under the greeting before the first message
+INITIAL_SUGGESTIONS = (
+    "What doors do I have access to?",
+    "Show today's entries",
+    "Show my account"
+)
+
+# Every button the UI renders sends its text back verbatim, so classify them
+# once at import and the first click is already a cache hit
+CANNED_PHRASES = (
+    *QUICK_ACTIONS.values(),
+    *INITIAL_SUGGESTIONS,
+    *(suggestion
+      for payload in _INTENT_PAYLOADS.values()
+      for suggestion in payload["follow_up_suggestions"]),
+)
+for _phrase in CANNED_PHRASES:
+    classify_message(_phrase)
+del _phrase
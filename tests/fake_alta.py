@@ -0,0 +1,66 @@
+"""Minimal in-process stand-in for the Alta API, for the app tests"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+
+class FakeAlta:
+    """
+    Serve /me, access points and access events for one fake organization
+
+    Attributes:
+        points: Access points returned by /api/v1/accessControlPoints
+        events: Access events returned by /api/v1/accessEvents
+        me_fails: Answer /api/v1/me with a 503 while set
+        hits: Request path -> number of requests received
+    """
+
+    def __init__(self, token: str, points: List[Dict], events: List[Dict] = ()):
+        self.token = token
+        self.points = list(points)
+        self.events = list(events)
+        self.me_fails = False
+        self.hits: Dict[str, int] = {}
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body=None):
+                data = b"" if body is None else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                fake.hits[self.path] = fake.hits.get(self.path, 0) + 1
+                if self.headers.get("Authorization") != f"Bearer {fake.token}":
+                    return self._send(401, {})
+                if self.path == "/api/v1/me":
+                    if fake.me_fails:
+                        return self._send(503, {})
+                    return self._send(200, {"name": f"{fake.token} user", "id": fake.token})
+                if self.path == "/api/v1/accessControlPoints":
+                    return self._send(200, {"data": fake.points})
+                if self.path == "/api/v1/accessEvents":
+                    return self._send(200, {"data": fake.events})
+                return self._send(404, {})
+
+        return Handler
@@ -0,0 +1,74 @@
+"""Tests for AltaClient's local event handling (no network)"""
+
+import unittest
+
+from alta_client import AltaClient
+
+
+class CacheEventsTest(unittest.TestCase):
+    def setUp(self):
+        self.client = AltaClient("http://alta.invalid", "token")
+
+    def test_out_of_range_times_are_left_out_of_the_index(self):
+        events = [
+            {"guid": "ok", "time": 1_700_000_000_000},
+            {"guid": "huge", "time": 2 ** 63},
+            {"guid": "nan", "time": float("nan")},
+            {"guid": "inf", "time": float("inf")},
+            {"guid": "negative", "time": -1},
+            {"guid": "missing"},
+        ]
+
+        self.client._cache_events(events)
+
+        sorted_events, times = self.client._event_index
+        self.assertEqual([e["guid"] for e in sorted_events], ["ok"])
+        self.assertEqual(list(times), [1_700_000_000_000])
+        # Every event is still cached, only the time index skips them
+        self.assertEqual(len(self.client._cached_events), len(events))
+
+    def test_empty_response_resets_the_index(self):
+        self.client._cache_events([{"guid": "old", "time": 1_700_000_000_000}])
+        self.client._make_request = lambda *args, **kwargs: None
+
+        self.assertEqual(self.client._refresh_events(max_age=0), [])
+
+        self.assertEqual(self.client._cached_events, [])
+        self.assertEqual(self.client._event_index[0], [])
+        self.assertEqual(self.client.get_entries_last_n_days(30), [])
+
+
+class PartitionEntriesTest(unittest.TestCase):
+    EVENTS = [
+        {"event_type": "ACCESS_GRANTED", "event_name": "Access Granted"},
+        {"event_type": "ACCESS_DENIED", "event_name": "Access Denied"},
+        {"event_type": "DOOR_FORCED", "event_name": "Access Failed"},
+        {"event_type": "HELD_OPEN", "event_name": "Held open, access denied"},
+        {"event_type": "DOOR_OPENED"},
+        {},
+    ]
+
+    def test_partition_matches_the_single_filters(self):
+        client = AltaClient("http://alta.invalid", "token")
+
+        denied, granted = client.partition_entries(self.EVENTS)
+
+        self.assertEqual(denied, client.filter_denied_entries(self.EVENTS))
+        self.assertEqual(granted, client.filter_granted_entries(self.EVENTS))
+        self.assertEqual([e.get("event_name") for e in denied], ["Access Denied", "Access Failed"])
+
+
+class SharedSessionTest(unittest.TestCase):
+    def test_session_is_shared_per_token_not_per_base_url(self):
+        first = AltaClient("http://alta.invalid", "token-a")
+        same = AltaClient("http://alta.invalid", "token-a")
+        other = AltaClient("http://alta.invalid", "token-b")
+
+        self.assertIs(first.session, same.session)
+        # Separate sessions mean separate cookie jars per tenant
+        self.assertIsNot(first.session, other.session)
+        self.assertNotIn("token-a", first.token_digest)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,212 @@
+"""App-level tests driven through Streamlit's AppTest against a fake Alta API"""
+
+import os
+import time
+import unittest
+from collections import deque
+
+from streamlit.testing.v1 import AppTest
+
+from tests.fake_alta import FakeAlta
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def clear_streamlit_caches():
+    """Start each test from an empty st.cache_data / st.cache_resource"""
+    import streamlit as st
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+def run_app(fake: FakeAlta) -> AppTest:
+    """Start a fresh session of the app signed in to the given fake organization"""
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.secrets["alta"] = {"base_url": fake.base_url, "api_token": fake.token}
+    at.run()
+    assert not at.exception, at.exception
+    return at
+
+
+class CurrentUserTest(unittest.TestCase):
+    def setUp(self):
+        clear_streamlit_caches()
+        self.fake = FakeAlta("token-a", points=[])
+        self.addCleanup(self.fake.close)
+
+    def test_failed_me_is_retried_by_the_next_session(self):
+        self.fake.me_fails = True
+        first = run_app(self.fake)
+        self.assertEqual(first.session_state.current_user, {"name": "User"})
+
+        self.fake.me_fails = False
+        second = run_app(self.fake)
+        self.assertEqual(second.session_state.current_user["name"], "token-a user")
+
+
+def ask(at: AppTest, message: str) -> str:
+    """Send a chat message and return the assistant's reply"""
+    at.chat_input[0].set_value(message).run()
+    assert not at.exception, at.exception
+    return at.session_state.messages[-1]["content"]
+
+
+class TenantIsolationTest(unittest.TestCase):
+    """Cached reads must never be shared between organizations"""
+
+    def setUp(self):
+        clear_streamlit_caches()
+        now_ms = int(time.time() * 1000)
+        self.org_a = FakeAlta(
+            "token-a",
+            points=[{"id": 1, "name": "Alpha Lobby", "site_name": "A"}],
+            events=[{"guid": "a-1", "time": now_ms, "event_type": "ACCESS_GRANTED",
+                     "access_point_name": "Alpha Lobby"}],
+        )
+        self.org_b = FakeAlta(
+            "token-b",
+            points=[{"id": 2, "name": "Bravo Gate", "site_name": "B"}],
+            events=[{"guid": "b-1", "time": now_ms, "event_type": "ACCESS_GRANTED",
+                     "access_point_name": "Bravo Gate"}],
+        )
+        self.addCleanup(self.org_a.close)
+        self.addCleanup(self.org_b.close)
+
+    def test_access_points_are_cached_per_organization(self):
+        self.assertIn("Alpha Lobby", ask(run_app(self.org_a), "What doors do I have access to?"))
+
+        reply = ask(run_app(self.org_b), "What doors do I have access to?")
+        self.assertIn("Bravo Gate", reply)
+        self.assertNotIn("Alpha Lobby", reply)
+        self.assertGreaterEqual(self.org_b.hits.get("/api/v1/accessControlPoints", 0), 1)
+
+    def test_unlock_door_list_is_cached_per_organization(self):
+        def unlock_door_list(at: AppTest) -> str:
+            next(b for b in at.button if b.label == "Unlock Door").click().run()
+            assert not at.exception, at.exception
+            return at.session_state.messages[-1]["content"]
+
+        first = run_app(self.org_a)
+        self.assertIn("Alpha Lobby", unlock_door_list(first))
+
+        second = run_app(self.org_b)
+        reply = unlock_door_list(second)
+        self.assertIn("Bravo Gate", reply)
+        self.assertNotIn("Alpha Lobby", reply)
+        # Selecting by number must resolve against the same organization's list
+        self.assertEqual(
+            [point["name"] for point in second.session_state.pending_door_options],
+            ["Bravo Gate"]
+        )
+
+    def test_rotated_token_gets_its_own_client_and_reads(self):
+        first = run_app(self.org_a)
+        self.assertIn("Alpha Lobby", ask(first, "What doors do I have access to?"))
+
+        # Same base URL, new token: the org now answers only to the new token
+        self.org_a.token = "token-a-rotated"
+        self.org_a.points = [{"id": 3, "name": "Alpha Annex", "site_name": "A"}]
+        second = AppTest.from_file(APP_PATH, default_timeout=30)
+        second.secrets["alta"] = {"base_url": self.org_a.base_url, "api_token": "token-a-rotated"}
+        second.run()
+        self.assertFalse(second.exception, second.exception)
+
+        self.assertIsNot(second.session_state.api_client, first.session_state.api_client)
+        reply = ask(second, "What doors do I have access to?")
+        self.assertIn("Alpha Annex", reply)
+        self.assertNotIn("Alpha Lobby", reply)
+
+    def test_entries_are_cached_per_organization(self):
+        self.assertIn("Alpha Lobby", ask(run_app(self.org_a), "Show today's entries"))
+
+        reply = ask(run_app(self.org_b), "Show today's entries")
+        self.assertIn("Bravo Gate", reply)
+        self.assertNotIn("Alpha Lobby", reply)
+
+
+class ClearChatTest(unittest.TestCase):
+    def setUp(self):
+        clear_streamlit_caches()
+        self.now_ms = int(time.time() * 1000)
+        self.fake = FakeAlta(
+            "token-a",
+            points=[],
+            events=[{"guid": "g-1", "time": self.now_ms, "event_type": "ACCESS_GRANTED",
+                     "access_point_name": "Old Door"}],
+        )
+        self.addCleanup(self.fake.close)
+
+    def test_clear_chat_refetches_entries(self):
+        at = run_app(self.fake)
+        self.assertIn("Old Door", ask(at, "Show today's entries"))
+
+        self.fake.events.append({"guid": "g-2", "time": self.now_ms + 1,
+                                 "event_type": "ACCESS_GRANTED", "access_point_name": "New Door"})
+        next(b for b in at.button if b.label == "Clear Chat").click().run()
+        self.assertFalse(at.exception, at.exception)
+
+        self.assertIn("New Door", ask(at, "Show today's entries"))
+
+
+class PrefetchTest(unittest.TestCase):
+    def setUp(self):
+        clear_streamlit_caches()
+        self.fake = FakeAlta("token-a", points=[{"id": 7, "name": "Back Door", "site_name": "HQ"}])
+        self.addCleanup(self.fake.close)
+
+    def test_unlock_by_name_waits_for_the_prefetch(self):
+        at = run_app(self.fake)
+        self.assertIsNotNone(at.session_state.prefetch)
+
+        reply = ask(at, "unlock back door")
+
+        self.assertIsNone(at.session_state.prefetch)
+        self.assertIn("Back Door", reply)
+
+
+class MessageTrimTest(unittest.TestCase):
+    def setUp(self):
+        clear_streamlit_caches()
+        self.fake = FakeAlta("token-a", points=[{"id": 7, "name": "Back Door", "site_name": "HQ"}])
+        self.addCleanup(self.fake.close)
+
+    def test_trimming_drops_whole_turns_and_keeps_the_true_count(self):
+        at = run_app(self.fake)
+        turns = [
+            message
+            for n in range(100)
+            for message in ({"role": "user", "content": f"q{n}"},
+                            {"role": "assistant", "content": f"a{n}", "suggestions": []})
+        ]
+        at.session_state.messages = deque(turns)
+        at.session_state.message_count = len(turns)
+
+        next(b for b in at.button if b.label == "Unlock Door").click().run()
+
+        messages = at.session_state.messages
+        self.assertEqual(messages[0], {"role": "user", "content": "q1"})
+        self.assertIn("Available Doors", messages[-1]["content"])
+        self.assertEqual(at.session_state.message_count, 201)
+
+
+class FilterWindowTest(unittest.TestCase):
+    def setUp(self):
+        clear_streamlit_caches()
+        now_ms = int(time.time() * 1000)
+        self.fake = FakeAlta(
+            "token-a",
+            points=[],
+            events=[{"guid": "g-1", "time": now_ms - 86_400_000, "event_type": "ACCESS_GRANTED"}],
+        )
+        self.addCleanup(self.fake.close)
+
+    def test_empty_filter_reports_the_window_it_filtered(self):
+        at = run_app(self.fake)
+        ask(at, "Show last 30 days")
+
+        reply = ask(at, "Show only denied entries")
+        self.assertIn("No denied access events in the last 30 days.", reply)
+
+
+if __name__ == "__main__":
+    unittest.main()
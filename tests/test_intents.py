@@ -0,0 +1,33 @@
+"""Tests for the context-free intent classifier"""
+
+import unittest
+
+from intents import INITIAL_SUGGESTIONS, QUICK_ACTIONS, classify_message, match_keyword_intent
+
+
+class KeywordMatchingTest(unittest.TestCase):
+    def test_keyword_embedded_in_a_longer_word_matches_as_a_substring(self):
+        # Same semantics as the original `phrase in message` checks
+        self.assertEqual(match_keyword_intent("is the backdoor locked"), "get_access_points")
+        self.assertEqual(match_keyword_intent("that was helpful"), "show_help")
+
+    def test_unrelated_message_has_no_keyword_intent(self):
+        self.assertIsNone(match_keyword_intent("good morning"))
+        self.assertEqual(classify_message("good morning")["intent"], "unsupported")
+
+
+
+class CannedPhraseSeedingTest(unittest.TestCase):
+    def test_ui_button_phrases_are_classified_at_import(self):
+        phrases = (*QUICK_ACTIONS.values(), *INITIAL_SUGGESTIONS)
+        misses = classify_message.cache_info().misses
+
+        for phrase in phrases:
+            classify_message(phrase)
+
+        self.assertEqual(classify_message.cache_info().misses, misses)
+        self.assertEqual(classify_message("Show denied access attempts")["intent"], "get_denied_entries")
+
+
+if __name__ == "__main__":
+    unittest.main()